@@ -0,0 +1,201 @@
+"""
+DeltaForceAPI 压测脚本
+在本地模拟后端上按指令/推送的真实调用模式驱动 DeltaForceAPI，
+输出吞吐量、p50/p95/p99 延迟以及各镜像的请求分布（故障转移情况）
+
+用法:
+    python benchmark/load_test.py --duration 30 --concurrency 50 --storm 20:5
+    python benchmark/load_test.py --external   # 使用已单独启动的 mock_server.py
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import aiohttp
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from df_api import ApiUrlManager, DeltaForceAPI, PRIORITY_BACKGROUND  # noqa: E402
+from mock_server import add_arguments, build_profiles, start_mirrors, stop_mirrors  # noqa: E402
+
+TOKEN = "mock-framework-token"
+
+
+def is_success(result) -> bool:
+    return isinstance(result, dict) and (result.get("success") is True or result.get("code") in (0, 200, "0"))
+
+
+def random_ids(count: int) -> List[str]:
+    return [str(random.randint(10000000, 10000200)) for _ in range(count)]
+
+
+# ===== 场景：模拟各处理器/推送的调用方式 =====
+
+async def scenario_price(api: DeltaForceAPI) -> bool:
+    """价格查询：多个ID并发解析后批量查价（ToolsHandler.get_current_price）"""
+    ids = random_ids(3)
+    results = await asyncio.gather(*(api.search_object(object_ids=i) for i in ids))
+    price = await api.get_current_price(",".join(ids))
+    return all(is_success(r) for r in results) and is_success(price)
+
+
+async def scenario_search(api: DeltaForceAPI) -> bool:
+    """名称搜索（ToolsHandler.search）"""
+    return is_success(await api.search_object(keyword=random.choice(["显卡", "非洲之心", "医疗箱"])))
+
+
+async def scenario_personal(api: DeltaForceAPI) -> bool:
+    """个人信息（InfoHandler.get_money / get_personal_info，对冲请求）"""
+    money, info = await asyncio.gather(api.get_money(TOKEN), api.get_personal_info(TOKEN))
+    return is_success(money) and is_success(info)
+
+
+async def scenario_record(api: DeltaForceAPI) -> bool:
+    """战绩翻页（DataHandler.get_record）"""
+    for page in range(1, 4):
+        if not is_success(await api.get_record(TOKEN, 4, page)):
+            return False
+    return True
+
+
+async def scenario_static(api: DeltaForceAPI) -> bool:
+    """静态数据（干员/地图，命中缓存）"""
+    operators, maps = await asyncio.gather(api.get_operators(), api.get_maps())
+    return is_success(operators) and is_success(maps)
+
+
+async def scenario_push(api: DeltaForceAPI) -> bool:
+    """推送任务（每日密码/日报，后台优先级）"""
+    with api.priority(PRIORITY_BACKGROUND):
+        keyword, daily = await asyncio.gather(api.get_daily_keyword(), api.get_daily_record(TOKEN))
+    return is_success(keyword) and is_success(daily)
+
+
+SCENARIOS: Dict[str, tuple] = {
+    # 名称: (函数, 权重)
+    "price": (scenario_price, 30),
+    "search": (scenario_search, 15),
+    "personal": (scenario_personal, 20),
+    "record": (scenario_record, 15),
+    "static": (scenario_static, 10),
+    "push": (scenario_push, 10),
+}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """最近秩法分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+async def worker(api: DeltaForceAPI, stop_at: float, samples: Dict[str, List[float]], errors: Dict[str, int]):
+    names = list(SCENARIOS.keys())
+    weights = [SCENARIOS[name][1] for name in names]
+    while time.monotonic() < stop_at:
+        name = random.choices(names, weights)[0]
+        func: Callable[[DeltaForceAPI], Awaitable[bool]] = SCENARIOS[name][0]
+        start = time.monotonic()
+        try:
+            ok = await func(api)
+        except Exception:
+            ok = False
+        samples[name].append(time.monotonic() - start)
+        if not ok:
+            errors[name] += 1
+
+
+async def fetch_mirror_status(urls: List[str]) -> List[Dict]:
+    statuses = []
+    async with aiohttp.ClientSession() as session:
+        for url in urls:
+            try:
+                async with session.get(f"{url}/__mock__/status") as resp:
+                    statuses.append(await resp.json())
+            except aiohttp.ClientError:
+                statuses.append({"url": url, "hits": "?", "errors": "?"})
+    return statuses
+
+
+def print_report(elapsed: float, samples: Dict[str, List[float]], errors: Dict[str, int],
+                 mirrors: List[Dict], api_status: Dict, endpoints: List[Dict]):
+    all_samples = [s for values in samples.values() for s in values]
+    total = len(all_samples)
+    print("=" * 72)
+    print(f"总操作数: {total}  耗时: {elapsed:.1f}s  吞吐量: {total / elapsed:.1f} ops/s  "
+          f"失败: {sum(errors.values())}")
+    print("-" * 72)
+    print(f"{'场景':<10}{'次数':>8}{'失败':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}")
+    for name, values in list(samples.items()) + [("ALL", all_samples)]:
+        failed = errors.get(name, sum(errors.values()) if name == "ALL" else 0)
+        print(f"{name:<10}{len(values):>8}{failed:>8}"
+              f"{percentile(values, 0.50) * 1000:>12.1f}"
+              f"{percentile(values, 0.95) * 1000:>12.1f}"
+              f"{percentile(values, 0.99) * 1000:>12.1f}")
+    print("-" * 72)
+    print("镜像请求分布（服务端统计）:")
+    for mirror in mirrors:
+        print(f"  {mirror.get('name', mirror.get('url'))}: 请求 {mirror.get('hits')}，5xx {mirror.get('errors')}")
+    print("客户端镜像排名:")
+    for item in api_status.get("ranking", []):
+        latency = f"{item['latency_ms']}ms" if item["latency_ms"] is not None else "-"
+        print(f"  {item['name']}: 延迟 {latency}，错误率 {item['error_rate']:.1%}，"
+              f"样本 {item['samples']}{'，已标记失败' if item['failed'] else ''}")
+    open_breakers = [b for b in api_status.get("breakers", []) if b.get("state") != "closed"]
+    print(f"未闭合熔断器: {len(open_breakers)}  对冲请求: {api_status.get('hedged_requests', 0)}")
+    print("接口指标（按调用次数）:")
+    for row in endpoints:
+        print(f"  {row['url']}: 调用 {row['calls']}，错误 {row['errors']}，均值 {row['avg_ms']}ms，"
+              f"p95 {row['p95_ms']}ms，重试 {row['retries']}，切换 {row['failovers']}")
+    print("=" * 72)
+
+
+async def run(args: argparse.Namespace):
+    profiles = build_profiles(args)
+    runners = [] if args.external else await start_mirrors(profiles)
+
+    # 将 API 地址指向本地模拟镜像
+    ApiUrlManager.URLS = {profile.name: profile.base_url for profile in profiles}
+    ApiUrlManager.AUTO_ORDER = [profile.name for profile in profiles]
+    ApiUrlManager.VALID_MODES = ["auto"] + ApiUrlManager.AUTO_ORDER
+
+    api = DeltaForceAPI(token="mock", clientid="mock", api_mode=args.mode,
+                        timeout=args.timeout, deadline=args.deadline)
+    await api.start()
+    await api.warm_up()
+
+    samples: Dict[str, List[float]] = {name: [] for name in SCENARIOS}
+    errors: Dict[str, int] = {name: 0 for name in SCENARIOS}
+    start = time.monotonic()
+    try:
+        await asyncio.gather(*(
+            worker(api, start + args.duration, samples, errors) for _ in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - start
+        mirrors = await fetch_mirror_status([profile.base_url for profile in profiles])
+        print_report(elapsed, samples, errors, mirrors, api.get_api_status(), api.metrics.get_summary(limit=10))
+    finally:
+        await api.close()
+        await stop_mirrors(runners)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DeltaForceAPI 本地压测")
+    add_arguments(parser)
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发协程数")
+    parser.add_argument("--mode", default="auto", help="API 模式")
+    parser.add_argument("--timeout", type=int, default=10, help="单次请求超时（秒）")
+    parser.add_argument("--deadline", type=int, default=20, help="交互请求截止时间（秒）")
+    parser.add_argument("--external", action="store_true", help="不在本进程启动模拟后端")
+    parser.add_argument("--verbose", action="store_true", help="输出 DeltaForceAPI 日志")
+    cli_args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if cli_args.verbose else logging.CRITICAL)
+    asyncio.run(run(cli_args))
@@ -0,0 +1,243 @@
+"""
+本地模拟后端
+实现 df_api.py 用到的 df-api 路由，返回录制或合成的数据
+每个镜像可独立配置延迟、错误率和周期性 5xx 风暴，用于离线压测 DeltaForceAPI
+
+用法:
+    python benchmark/mock_server.py --port 18080 --mirrors 3 --latency 50 --error-rate 0.02 --storm 30:5
+    录制数据放在 --fixtures 目录下，文件名为路径把 "/" 换成 "_"，如 df_object_search.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+class MirrorProfile:
+    """单个模拟镜像的行为配置"""
+
+    def __init__(self, name: str, port: int, latency: float = 0.05, jitter: float = 0.02,
+                 error_rate: float = 0.0, storm_every: float = 0, storm_duration: float = 0,
+                 fixtures: Optional[Path] = None):
+        """
+        Args:
+            name: 镜像名称（对应 ApiUrlManager.URLS 的键）
+            port: 监听端口
+            latency: 平均延迟（秒）
+            jitter: 延迟抖动（秒）
+            error_rate: 随机返回 500 的概率 (0~1)
+            storm_every: 5xx 风暴周期（秒），0 表示不启用
+            storm_duration: 每个周期内风暴持续时间（秒）
+            fixtures: 录制数据目录
+        """
+        self.name = name
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.storm_every = storm_every
+        self.storm_duration = storm_duration
+        self.fixtures = fixtures
+        self.started_at = time.monotonic()
+        self.hits = 0  # 收到的请求数
+        self.errors = 0  # 返回的 5xx 数
+        self.routes: Dict[str, int] = {}  # 按路径统计的请求数
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def in_storm(self) -> bool:
+        """当前是否处于 5xx 风暴期"""
+        if self.storm_every <= 0:
+            return False
+        return (time.monotonic() - self.started_at) % self.storm_every < self.storm_duration
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "url": self.base_url,
+            "hits": self.hits,
+            "errors": self.errors,
+            "routes": dict(self.routes)
+        }
+
+
+def _ok(data: Any) -> Dict:
+    return {"success": True, "code": 0, "msg": "success", "data": data}
+
+
+def _ids(value: str) -> List[str]:
+    """解析 id 参数，兼容逗号分隔和 JSON 数组两种格式"""
+    if not value:
+        return []
+    if value.startswith("["):
+        try:
+            return [str(i) for i in json.loads(value)]
+        except json.JSONDecodeError:
+            return []
+    return [i.strip() for i in value.split(",") if i.strip()]
+
+
+def _item(object_id: str) -> Dict:
+    return {
+        "objectID": int(object_id) if object_id.isdigit() else object_id,
+        "objectName": f"模拟物品{object_id}",
+        "name": f"模拟物品{object_id}",
+        "grade": int(object_id) % 6 + 1 if object_id.isdigit() else 1,
+        "primaryClass": "props",
+        "secondClass": "collection",
+        "avgPrice": random.randint(1000, 2000000)
+    }
+
+
+def synthesize(path: str, query: Dict[str, str]) -> Dict:
+    """按路径生成合成数据"""
+    if path in ("/health", "/df/object/health", "/df/tts/health"):
+        return {"status": "ok"}
+    if path == "/health/detailed":
+        return _ok({"status": "ok", "uptime": int(time.monotonic())})
+    if path == "/df/object/search":
+        ids = _ids(query.get("id", ""))
+        if not ids and query.get("name"):
+            ids = [str(random.randint(10000000, 19999999))]
+        return _ok({"keywords": [_item(i) for i in ids]})
+    if path == "/df/object/price/latest":
+        return _ok({"prices": [
+            {"objectID": int(i) if i.isdigit() else i, "avgPrice": random.randint(1000, 2000000)}
+            for i in _ids(query.get("id", ""))
+        ]})
+    if path == "/df/object/price/history/v2":
+        now = int(time.time())
+        return _ok({"objectID": query.get("id"), "history": [
+            {"timestamp": now - i * 3600, "avgPrice": random.randint(1000, 2000000)} for i in range(168)
+        ]})
+    if path == "/df/object/list":
+        return _ok({"keywords": [_item(str(10000000 + i)) for i in range(500)]})
+    if path == "/df/tools/dailykeyword":
+        return _ok({"list": [{"mapName": name, "secret": random.randint(0, 9999)}
+                             for name in ("零号大坝", "长弓溪谷", "巴克什", "航天基地")]})
+    if path == "/df/person/record":
+        page = int(query.get("page", 1) or 1)
+        return _ok([{"MapId": "2231", "EscapeFailReason": 1, "FinalPrice": random.randint(0, 3000000),
+                     "dtEventTime": f"2024-01-01 00:{page:02d}:{i:02d}"} for i in range(10)])
+    if path == "/df/person/flows":
+        return _ok([{"Name": "模拟流水", "Num": random.randint(1, 100000),
+                     "dtEventTime": "2024-01-01 00:00:00"} for _ in range(10)])
+    if path == "/df/person/money":
+        return _ok([{"item": "17020000010", "name": "哈夫币", "totalMoney": random.randint(0, 99999999)}])
+    if path.startswith("/df/place/profitRank"):
+        return _ok({"groups": {place: [_item(str(20000000 + i)) for i in range(20)]
+                               for place in ("tech", "workbench", "pharmacy", "armory")}})
+    return _ok({})
+
+
+def create_app(profile: MirrorProfile) -> web.Application:
+    """创建单个模拟镜像的应用"""
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        path = request.path
+        profile.hits += 1
+        profile.routes[path] = profile.routes.get(path, 0) + 1
+
+        await asyncio.sleep(max(0.0, random.gauss(profile.latency, profile.jitter)))
+
+        if profile.in_storm() or random.random() < profile.error_rate:
+            profile.errors += 1
+            return web.json_response({"code": 500, "msg": "mock server error"}, status=500)
+
+        query = dict(request.query)
+        if request.method == "POST" and request.can_read_body:
+            if request.content_type == "application/json":
+                body = await request.json()
+                if isinstance(body, dict):
+                    query.update({k: str(v) for k, v in body.items()})
+            else:
+                query.update({k: str(v) for k, v in (await request.post()).items()})
+
+        if profile.fixtures:
+            fixture = profile.fixtures / (path.strip("/").replace("/", "_") + ".json")
+            if fixture.exists():
+                return web.Response(text=fixture.read_text(encoding="utf-8"), content_type="application/json")
+        return web.json_response(synthesize(path, query))
+
+    async def status(request: web.Request) -> web.Response:
+        return web.json_response(profile.get_status())
+
+    app = web.Application()
+    app.router.add_get("/__mock__/status", status)
+    app.router.add_route("*", "/{tail:.*}", handle)
+    return app
+
+
+async def start_mirrors(profiles: List[MirrorProfile]) -> List[web.AppRunner]:
+    """在本进程内启动一组模拟镜像，返回 runner 列表（用 stop_mirrors 关闭）"""
+    runners = []
+    for profile in profiles:
+        runner = web.AppRunner(create_app(profile), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", profile.port).start()
+        runners.append(runner)
+    return runners
+
+
+async def stop_mirrors(runners: List[web.AppRunner]):
+    for runner in runners:
+        await runner.cleanup()
+
+
+def build_profiles(args: argparse.Namespace) -> List[MirrorProfile]:
+    """根据命令行参数构建镜像配置，风暴只施加在第一个镜像上以观察故障转移"""
+    names = ["default", "eo", "esa"][:args.mirrors]
+    storm_every, storm_duration = 0.0, 0.0
+    if args.storm:
+        storm_every, storm_duration = (float(v) for v in args.storm.split(":"))
+    fixtures = Path(args.fixtures) if args.fixtures else None
+    return [
+        MirrorProfile(
+            name=name,
+            port=args.port + i,
+            latency=args.latency / 1000 * (1 + 0.5 * i),
+            jitter=args.jitter / 1000,
+            error_rate=args.error_rate,
+            storm_every=storm_every if i == 0 else 0,
+            storm_duration=storm_duration if i == 0 else 0,
+            fixtures=fixtures
+        )
+        for i, name in enumerate(names)
+    ]
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--port", type=int, default=18080, help="首个镜像端口，其余镜像依次 +1")
+    parser.add_argument("--mirrors", type=int, default=3, choices=[1, 2, 3], help="镜像数量")
+    parser.add_argument("--latency", type=float, default=50, help="平均延迟（毫秒），后续镜像依次增加 50%%")
+    parser.add_argument("--jitter", type=float, default=20, help="延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机 500 概率")
+    parser.add_argument("--storm", default="", help="首个镜像的 5xx 风暴，格式 周期:持续（秒），如 30:5")
+    parser.add_argument("--fixtures", default="", help="录制数据目录")
+
+
+async def _serve(args: argparse.Namespace):
+    profiles = build_profiles(args)
+    runners = await start_mirrors(profiles)
+    for profile in profiles:
+        print(f"[mock] {profile.name}: {profile.base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_mirrors(runners)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="三角洲 df-api 本地模拟后端")
+    add_arguments(parser)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -1,11 +1,46 @@
 import aiohttp
 import asyncio
+import functools
 import json
 import logging
-from typing import Optional, Dict, Any, List, Set
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Set, Tuple, Callable, Awaitable, AsyncIterator
 
 logger = logging.getLogger(__name__)
 
+# JSON 解码：优先使用 orjson (可选依赖)，未安装时使用标准库，均直接从 bytes 解码
+try:
+    import orjson
+    json_loads: Callable[[bytes], Any] = orjson.loads
+    HAS_ORJSON = True
+except ImportError:
+    json_loads = json.loads
+    HAS_ORJSON = False
+
+# 请求优先级：聊天命令为 interactive（默认），推送等后台任务为 background
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+_request_priority: ContextVar[str] = ContextVar("df_request_priority", default=PRIORITY_INTERACTIVE)
+# 请求截止时间（time.monotonic() 绝对时间），None 表示按优先级使用默认值
+_request_deadline: ContextVar[Optional[float]] = ContextVar("df_request_deadline", default=None)
+
+
+def background_priority(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """装饰推送等后台任务的入口协程，其中发起的 API 请求均使用 background 优先级"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _request_priority.set(PRIORITY_BACKGROUND)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _request_priority.reset(token)
+    return wrapper
+
 
 class ServerError(Exception):
     """服务器错误异常（5xx），用于触发重试和地址切换"""
@@ -15,11 +50,360 @@ class ServerError(Exception):
         super().__init__(f"服务器错误 ({status_code}): {message}")
 
 
+class MirrorStats:
+    """单个后端地址的实时质量统计（EWMA）"""
+    
+    LATENCY_ALPHA = 0.3  # 延迟平滑系数
+    ERROR_ALPHA = 0.2  # 错误率平滑系数
+    WINDOW_SIZE = 100  # 用于计算分位数的最近样本数
+    
+    def __init__(self):
+        self.latency: Optional[float] = None  # EWMA 延迟（秒），None 表示尚无样本
+        self.recent: deque = deque(maxlen=self.WINDOW_SIZE)  # 最近成功请求的延迟样本
+        self.error_rate: float = 0.0  # EWMA 错误率 (0~1)
+        self.samples: int = 0
+        self.last_success: float = 0.0
+        self.last_failure: float = 0.0
+    
+    def record_success(self, latency: float):
+        """记录一次成功请求"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.LATENCY_ALPHA * (latency - self.latency)
+        self.recent.append(latency)
+        self.error_rate *= (1 - self.ERROR_ALPHA)
+        self.samples += 1
+        self.last_success = time.monotonic()
+    
+    def record_failure(self):
+        """记录一次失败请求"""
+        self.error_rate += self.ERROR_ALPHA * (1 - self.error_rate)
+        self.samples += 1
+        self.last_failure = time.monotonic()
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """最近样本的延迟分位数（秒），样本不足时返回 None"""
+        if len(self.recent) < 10:
+            return None
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """
+    对冲请求预算
+    每个可对冲请求存入 ratio 个令牌，每次对冲消耗 1 个，
+    保证对冲请求数不超过可对冲请求总数的 ratio 比例
+    """
+    
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+        self.hedged = 0
+    
+    def deposit(self):
+        """记录一次可对冲请求"""
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+    
+    def try_acquire(self) -> bool:
+        """尝试消耗一次对冲名额"""
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.hedged += 1
+            return True
+        return False
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    closed: 正常放行；连续失败达到阈值后进入 open
+    open: 直接拒绝，冷却时间到后进入 half_open
+    half_open: 仅放行一个探测请求，成功则关闭，失败则重新打开
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, open_duration: float = 30):
+        """
+        初始化熔断器
+        
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            open_duration: 熔断持续时间（秒），同时作为探测请求的超时判定
+        """
+        self.failure_threshold = failure_threshold
+        self.open_duration = open_duration
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: Optional[float] = None
+    
+    def allow_request(self) -> bool:
+        """判断是否放行请求（half_open 状态下会占用唯一的探测名额）"""
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.open_duration:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_started = None
+        # half_open: 同一时间只允许一个探测请求；探测超时未回报则允许重新探测
+        if self._probe_started is not None and now - self._probe_started < self.open_duration:
+            return False
+        self._probe_started = now
+        return True
+    
+    def release_probe(self):
+        """归还未实际发出的探测名额"""
+        if self.state == self.HALF_OPEN:
+            self._probe_started = None
+    
+    def record_success(self):
+        """记录成功，关闭熔断器"""
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_started = None
+    
+    def record_failure(self):
+        """记录失败，必要时打开熔断器"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+    
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+
+class PriorityGate:
+    """
+    单个后端地址的限流与并发闸门
+    令牌桶限制请求速率，信号量式计数限制并发（各项为 0 表示不限制）；
+    background 请求只能使用部分并发，且有 interactive 请求排队时让行
+    """
+    
+    def __init__(self, rate: float, burst: int, max_concurrency: int, background_concurrency: int):
+        """
+        初始化闸门
+        
+        Args:
+            rate: 令牌补充速率（请求/秒），0 表示不限速
+            burst: 令牌桶容量，0 表示取速率的 2 倍
+            max_concurrency: 最大并发请求数，0 表示不限制
+            background_concurrency: background 请求的最大并发数，0 表示不限制
+        """
+        self.rate = rate
+        self.burst = burst or max(1.0, rate * 2)
+        self.max_concurrency = max_concurrency
+        self.background_concurrency = background_concurrency
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._background_in_flight = 0
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self._cond = asyncio.Condition()
+    
+    def _refill(self):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def _concurrency_full(self) -> bool:
+        return 0 < self.max_concurrency <= self._in_flight
+    
+    def _can_admit(self, priority: str) -> bool:
+        if self._concurrency_full() or (self.rate > 0 and self._tokens < 1):
+            return False
+        if priority == PRIORITY_BACKGROUND:
+            return (self._waiting[PRIORITY_INTERACTIVE] == 0
+                    and not 0 < self.background_concurrency <= self._background_in_flight)
+        return True
+    
+    def _wait_time(self) -> Optional[float]:
+        """距离下一个令牌的时间；受并发限制或不限速时返回 None（等待释放通知）"""
+        if self.rate <= 0 or self._concurrency_full() or self._tokens >= 1:
+            return None
+        return (1 - self._tokens) / self.rate
+    
+    @asynccontextmanager
+    async def slot(self, priority: str = PRIORITY_INTERACTIVE, deadline: Optional[float] = None):
+        """
+        占用一个请求名额
+        
+        Args:
+            priority: 请求优先级
+            deadline: 排队截止时间（time.monotonic()），超时抛出 DeadlineExceeded
+        """
+        if priority not in self._waiting:
+            priority = PRIORITY_INTERACTIVE
+        async with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    if self._can_admit(priority):
+                        break
+                    wait_time = self._wait_time()
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise DeadlineExceeded()
+                        wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait_time)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiting[priority] -= 1
+            if self.rate > 0:
+                self._tokens -= 1
+            self._in_flight += 1
+            if priority == PRIORITY_BACKGROUND:
+                self._background_in_flight += 1
+            # interactive 排队数变化后唤醒 background 等待者重新判断
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._in_flight -= 1
+                if priority == PRIORITY_BACKGROUND:
+                    self._background_in_flight -= 1
+                self._cond.notify_all()
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "background_in_flight": self._background_in_flight,
+            "waiting": dict(self._waiting)
+        }
+
+
+class ResponseTooLarge(Exception):
+    """响应体超过大小上限"""
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+        super().__init__(f"响应体过大 ({size} > {limit} 字节)")
+
+
+class DeadlineExceeded(Exception):
+    """请求在限流闸门排队期间超过截止时间"""
+
+
+class MicroBatcher:
+    """
+    按物品ID微批量合并请求
+    在很短的时间窗口内收集所有并发调用方的ID，分块后一次性请求，再把结果按ID分发回各调用方
+    """
+    
+    def __init__(self, fetch: Callable[[List[str]], Awaitable[Dict]], list_key: str,
+                 window: float = 0.005, max_batch: int = 50):
+        """
+        初始化批量器
+        
+        Args:
+            fetch: 实际请求函数，参数为一组ID，返回 API 响应
+            list_key: 响应 data 中结果列表的字段名（如 keywords / prices）
+            window: 收集窗口（秒）
+            max_batch: 单次请求的最大ID数
+        """
+        self.fetch = fetch
+        self.list_key = list_key
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def load(self, ids: List[str]) -> Dict:
+        """
+        查询一组ID，返回与单次请求相同结构的响应（保留接口 data 中的其他字段）:
+        {"success": True, "code": 0, "data": {list_key: [...], ...}}
+        部分分块请求失败时额外包含 failed_ids（失败的ID列表）和 msg（失败原因）；
+        全部失败时直接返回失败的响应
+        """
+        loop = asyncio.get_running_loop()
+        object_ids = list(dict.fromkeys(str(i).strip() for i in ids if str(i).strip()))
+        futures = []
+        for object_id in object_ids:
+            future = loop.create_future()
+            self._pending.setdefault(object_id, []).append(future)
+            futures.append(future)
+        if self._flush_handle is None and self._pending:
+            self._flush_handle = loop.call_later(self.window, self._start_flush)
+        
+        items: List[Dict] = []
+        failed_ids: List[str] = []
+        error: Optional[Dict] = None
+        template: Optional[Dict] = None
+        for object_id, (item, err, response) in zip(object_ids, await asyncio.gather(*futures)):
+            if item is not None:
+                items.append(item)
+            if err is not None:
+                error = err
+                failed_ids.append(object_id)
+            elif template is None:
+                template = response
+        if template is None and error is not None:
+            return error
+        
+        # 按第一个成功分块的响应结构合并结果
+        result = dict(template) if template else {"success": True, "code": 0}
+        data = template.get("data") if template else None
+        result["data"] = {**(data if isinstance(data, dict) else {}), self.list_key: items}
+        if failed_ids:
+            result["failed_ids"] = failed_ids
+            result["msg"] = f"{len(failed_ids)} 个物品查询失败: {error.get('msg') if isinstance(error, dict) else error}"
+        return result
+    
+    def _start_flush(self):
+        self._flush_handle = None
+        task = asyncio.create_task(self._flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _flush(self):
+        """发送当前批次并分发结果"""
+        pending, self._pending = self._pending, {}
+        ids = list(pending.keys())
+        chunks = [ids[i:i + self.max_batch] for i in range(0, len(ids), self.max_batch)]
+        results = await asyncio.gather(*(self.fetch(chunk) for chunk in chunks), return_exceptions=True)
+        
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                result = {"code": -1, "msg": f"批量请求失败: {result}", "data": None}
+            is_success = isinstance(result, dict) and (
+                result.get("success") is True or result.get("code") in (0, 200, "0")
+            )
+            by_id: Dict[str, Dict] = {}
+            if is_success:
+                data = result.get("data") or {}
+                for item in (data.get(self.list_key) or []) if isinstance(data, dict) else []:
+                    by_id[str(item.get("objectID", ""))] = item
+            for object_id in chunk:
+                outcome = (by_id.get(object_id), None if is_success else result, result if is_success else None)
+                for future in pending.get(object_id, []):
+                    if not future.done():
+                        future.set_result(outcome)
+
+
 class ApiUrlManager:
     """
     API URL 管理器
     负责管理多个后端地址，支持故障转移和模式切换
-    使用 Timeout 机制和重试逻辑
+    auto 模式下按实时延迟和错误率对地址排序，失败地址冷却后自动恢复
     """
     
     # 三个后端地址
@@ -32,6 +416,13 @@ class ApiUrlManager:
     # 有效模式列表
     VALID_MODES = ["auto", "default", "eo", "esa"]
     
+    # auto 模式下无统计数据时的默认优先顺序
+    AUTO_ORDER = ["eo", "esa", "default"]
+    
+    FAILURE_COOLDOWN = 60  # 失败地址冷却时间（秒），到期后自动恢复
+    UNKNOWN_LATENCY = 1.0  # 尚无样本时假定的延迟（秒）
+    ERROR_PENALTY = 4.0  # 错误率对排序分数的惩罚系数
+    
     def __init__(self, mode: str = "auto", timeout: int = 30, retry_count: int = 3):
         """
         初始化 API URL 管理器
@@ -45,6 +436,8 @@ class ApiUrlManager:
         self.timeout = timeout
         self.retry_count = retry_count
         self.failed_urls: Set[str] = set()
+        self._failed_at: Dict[str, float] = {}
+        self.stats: Dict[str, MirrorStats] = {url: MirrorStats() for url in self.URLS.values()}
     
     @property
     def mode(self) -> str:
@@ -54,36 +447,84 @@ class ApiUrlManager:
     def mode(self, value: str):
         if value in self.VALID_MODES:
             self._mode = value
-            self.failed_urls.clear()
+            self.reset_failures()
         else:
             logger.warning(f"[ApiUrlManager] 无效的模式: {value}，使用默认 auto")
             self._mode = "auto"
     
+    def get_candidate_urls(self) -> List[str]:
+        """获取当前模式下的全部地址（不过滤失败地址）"""
+        if self._mode == "auto":
+            return [self.URLS[name] for name in self.AUTO_ORDER]
+        return [self.URLS.get(self._mode, self.URLS["default"])]
+    
+    def _readmit_expired(self):
+        """冷却时间已过的失败地址重新加入可用列表"""
+        now = time.monotonic()
+        for url in list(self.failed_urls):
+            if now - self._failed_at.get(url, 0) >= self.FAILURE_COOLDOWN:
+                self.failed_urls.discard(url)
+                self._failed_at.pop(url, None)
+                logger.info(f"[ApiUrlManager] 地址冷却结束，重新启用: {url}")
+    
+    def score(self, url: str) -> float:
+        """地址排序分数（越小越优）：EWMA 延迟按错误率加权"""
+        stats = self.stats.get(url)
+        if stats is None:
+            return self.UNKNOWN_LATENCY
+        latency = stats.latency if stats.latency is not None else self.UNKNOWN_LATENCY
+        return latency * (1 + self.ERROR_PENALTY * stats.error_rate)
+    
     def get_available_urls(self) -> List[str]:
-        """获取可用的地址列表（过滤掉失败的地址）"""
+        """获取可用的地址列表（过滤掉失败的地址，auto 模式下按质量排序）"""
+        self._readmit_expired()
+        urls = [url for url in self.get_candidate_urls() if url not in self.failed_urls]
         if self._mode == "auto":
-            # 优先使用 eo 和 esa，default 作为备用
-            urls = [self.URLS["eo"], self.URLS["esa"], self.URLS["default"]]
-        else:
-            urls = [self.URLS.get(self._mode, self.URLS["default"])]
-        
-        return [url for url in urls if url not in self.failed_urls]
+            # sorted 为稳定排序，分数相同时保持默认优先顺序
+            urls = sorted(urls, key=self.score)
+        return urls
     
     def get_base_url(self) -> str:
         """获取当前应该使用的 API 地址"""
         available_urls = self.get_available_urls()
         return available_urls[0] if available_urls else self.URLS["default"]
     
+    def record_success(self, url: str, latency: float):
+        """记录请求成功及其延迟"""
+        self.stats.setdefault(url, MirrorStats()).record_success(latency)
+    
+    def record_failure(self, url: str):
+        """记录请求失败"""
+        self.stats.setdefault(url, MirrorStats()).record_failure()
+    
     def mark_url_failed(self, url: str):
-        """标记地址为失败"""
+        """标记地址为失败（冷却期内不参与选择）"""
         self.failed_urls.add(url)
-        logger.warning(f"[ApiUrlManager] 标记地址为失败: {url}")
+        self._failed_at[url] = time.monotonic()
+        logger.warning(f"[ApiUrlManager] 标记地址为失败: {url}，{self.FAILURE_COOLDOWN}秒后自动恢复")
     
     def reset_failures(self):
         """重置所有失败记录"""
         self.failed_urls.clear()
+        self._failed_at.clear()
         logger.info("[ApiUrlManager] 已重置所有失败记录")
     
+    def get_ranking(self) -> List[Dict[str, Any]]:
+        """获取地址排名（用于状态展示）"""
+        names = {url: name for name, url in self.URLS.items()}
+        ranking = []
+        for url in sorted(self.get_candidate_urls(), key=self.score):
+            stats = self.stats.get(url) or MirrorStats()
+            ranking.append({
+                "name": names.get(url, url),
+                "url": url,
+                "latency_ms": round(stats.latency * 1000) if stats.latency is not None else None,
+                "error_rate": round(stats.error_rate, 3),
+                "samples": stats.samples,
+                "failed": url in self.failed_urls
+            })
+        return ranking
+    
     def get_status(self) -> Dict[str, Any]:
         """获取当前状态信息（用于调试）"""
         available_urls = self.get_available_urls()
@@ -92,15 +533,321 @@ class ApiUrlManager:
             "current_url": available_urls[0] if available_urls else self.URLS["default"],
             "available_urls": available_urls,
             "failed_urls": list(self.failed_urls),
-            "total_urls": 3 if self._mode == "auto" else 1
+            "total_urls": 3 if self._mode == "auto" else 1,
+            "ranking": self.get_ranking()
+        }
+
+
+class ResponseCache:
+    """
+    API 响应缓存
+    有界 LRU + 分级 TTL，过期后在宽限期内返回旧数据并后台刷新（stale-while-revalidate）
+    """
+    
+    # 不参与缓存键计算的参数（用户令牌）
+    TOKEN_PARAMS = {"frameworkToken", "token", "framework_token"}
+    
+    def __init__(self, max_size: int = 256):
+        """
+        初始化响应缓存
+        
+        Args:
+            max_size: 最大缓存条目数，超出后淘汰最久未使用的条目
+        """
+        self.max_size = max_size
+        # key -> (result, expires_at, stale_until)
+        self._entries: "OrderedDict[str, Tuple[Dict, float, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def make_key(cls, method: str, url: str, params: Optional[Dict] = None,
+                 json_data: Optional[Dict] = None) -> str:
+        """生成缓存键（忽略令牌类参数）"""
+        parts = [method.upper(), url]
+        for payload in (params, json_data):
+            if payload:
+                items = sorted(
+                    (str(k), str(v)) for k, v in payload.items()
+                    if k not in cls.TOKEN_PARAMS
+                )
+                parts.append("&".join(f"{k}={v}" for k, v in items))
+        return "|".join(parts)
+    
+    def get(self, key: str) -> Tuple[Optional[Dict], bool]:
+        """
+        读取缓存
+        
+        Returns:
+            (result, is_fresh): 未命中或已超出宽限期时 result 为 None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        
+        result, expires_at, stale_until = entry
+        now = time.monotonic()
+        if now >= stale_until:
+            del self._entries[key]
+            self.misses += 1
+            return None, False
+        
+        self._entries.move_to_end(key)
+        if now < expires_at:
+            self.hits += 1
+            return result, True
+        self.stale_hits += 1
+        return result, False
+    
+    def set(self, key: str, result: Dict, ttl: float, stale_ttl: float = 0):
+        """写入缓存"""
+        now = time.monotonic()
+        self._entries[key] = (result, now + ttl, now + ttl + stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> int:
+        """清空缓存，返回清除的条目数"""
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+    
+    def get_status(self) -> Dict[str, Any]:
+        """获取缓存状态信息"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses
         }
 
 
+class EndpointMetrics:
+    """单个接口的调用统计"""
+    
+    # 延迟直方图桶上界（秒），最后一个桶为 +Inf
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    
+    def __init__(self):
+        self.calls = 0  # 调用次数（含缓存命中）
+        self.errors = 0  # 失败次数（5xx 或全部地址失败）
+        self.retries = 0  # 同一地址上的重试次数
+        self.failovers = 0  # 切换到其他地址的次数
+        self.bytes_received = 0  # 接收的响应体字节数
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.inflight = 0  # 进行中的调用数
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(self.BUCKETS) + 1)
+    
+    def observe(self, latency: float, error: bool):
+        """记录一次调用的耗时和结果"""
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.latency_sum += latency
+        for i, bound in enumerate(self.BUCKETS):
+            if latency <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """按直方图估算分位数（取所在桶上界），无样本时返回 None"""
+        if self.calls == 0:
+            return None
+        target = q * self.calls
+        count = 0
+        for i, bound in enumerate(self.BUCKETS):
+            count += self.buckets[i]
+            if count >= target:
+                return bound
+        return float("inf")
+    
+    @property
+    def cache_hit_ratio(self) -> Optional[float]:
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        p95 = self.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "failovers": self.failovers,
+            "bytes_received": self.bytes_received,
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "inflight": self.inflight,
+            "avg_ms": round(self.latency_sum / self.calls * 1000) if self.calls else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None and p95 != float("inf") else None
+        }
+
+
+class ApiMetrics:
+    """
+    按接口路径汇总的指标注册表
+    支持导出为 Prometheus 文本格式
+    """
+    
+    PREFIX = "deltaforce_api"
+    
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self.started_at = time.time()
+    
+    def endpoint(self, url: str) -> EndpointMetrics:
+        """获取（或创建）接口的统计对象"""
+        metrics = self.endpoints.get(url)
+        if metrics is None:
+            metrics = EndpointMetrics()
+            self.endpoints[url] = metrics
+        return metrics
+    
+    def reset(self):
+        self.endpoints.clear()
+        self.started_at = time.time()
+    
+    def get_summary(self, sort_by: str = "calls", limit: int = 0) -> List[Dict[str, Any]]:
+        """
+        获取各接口统计，按指定字段降序排列
+        
+        Args:
+            sort_by: 排序字段（calls / errors / avg_ms / p95_ms / bytes_received 等）
+            limit: 返回条数，0 表示全部
+        """
+        def sort_key(row: Dict[str, Any]) -> float:
+            value = row.get(sort_by)
+            if value is None:
+                # 有样本但延迟为 None 表示超出最大直方图桶（>30s），应排在最前
+                return float("inf") if sort_by.endswith("_ms") and row["calls"] else 0
+            return value
+        
+        rows = [{"url": url, **metrics.to_dict()} for url, metrics in self.endpoints.items()]
+        rows.sort(key=sort_key, reverse=True)
+        return rows[:limit] if limit else rows
+    
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        p = self.PREFIX
+        lines = []
+        counters = [
+            ("calls_total", "calls", "API 调用次数"),
+            ("errors_total", "errors", "API 调用失败次数"),
+            ("retries_total", "retries", "同一地址上的重试次数"),
+            ("failovers_total", "failovers", "切换后端地址的次数"),
+            ("received_bytes_total", "bytes_received", "接收的响应体字节数"),
+            ("cache_hits_total", "cache_hits", "缓存命中次数"),
+            ("cache_misses_total", "cache_misses", "缓存未命中次数"),
+        ]
+        for name, attr, help_text in counters:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} counter")
+            for url, metrics in sorted(self.endpoints.items()):
+                lines.append(f'{p}_{name}{{endpoint="{url}"}} {getattr(metrics, attr)}')
+        
+        lines.append(f"# HELP {p}_inflight 进行中的 API 调用数")
+        lines.append(f"# TYPE {p}_inflight gauge")
+        for url, metrics in sorted(self.endpoints.items()):
+            lines.append(f'{p}_inflight{{endpoint="{url}"}} {metrics.inflight}')
+        
+        lines.append(f"# HELP {p}_latency_seconds API 调用耗时")
+        lines.append(f"# TYPE {p}_latency_seconds histogram")
+        for url, metrics in sorted(self.endpoints.items()):
+            cumulative = 0
+            for bound, count in zip(list(EndpointMetrics.BUCKETS) + ["+Inf"], metrics.buckets):
+                cumulative += count
+                lines.append(f'{p}_latency_seconds_bucket{{endpoint="{url}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_latency_seconds_sum{{endpoint="{url}"}} {metrics.latency_sum:.6f}')
+            lines.append(f'{p}_latency_seconds_count{{endpoint="{url}"}} {metrics.calls}')
+        return "\n".join(lines) + "\n"
+    
+    def dump(self, path: str):
+        """写入 Prometheus 文本文件（先写临时文件再替换，避免读到半截内容）"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
 class DeltaForceAPI:
     """三角洲 API 封装类"""
     
+    # 连接池配置
+    POOL_LIMIT = 100  # 总连接数上限
+    POOL_LIMIT_PER_HOST = 30  # 单个后端地址的连接数上限
+    DNS_CACHE_TTL = 300  # DNS 缓存时间（秒）
+    KEEPALIVE_TIMEOUT = 60  # 空闲连接保持时间（秒）
+    
+    # 后端地址健康探测
+    HEALTH_PROBE_PATH = "/health"
+    HEALTH_PROBE_INTERVAL = 60  # 探测间隔（秒）
+    HEALTH_PROBE_TIMEOUT = 5  # 单次探测超时（秒）
+    
+    # 熔断器配置：按后端地址 和 (后端地址, 接口族) 两个维度分别统计
+    MIRROR_BREAKER_THRESHOLD = 8  # 单个地址连续失败次数阈值
+    ENDPOINT_BREAKER_THRESHOLD = 5  # 单个地址上某接口族连续失败次数阈值
+    BREAKER_OPEN_DURATION = 30  # 熔断持续时间（秒）
+    
+    # 重试退避配置：指数退避 + 完全抖动
+    BACKOFF_BASE = 0.5  # 首次重试的退避上限（秒）
+    BACKOFF_CAP = 8.0  # 退避上限（秒）
+    RETRY_AFTER_STATUSES = (429, 503)  # 遵循 Retry-After 的状态码
+    BACKGROUND_DEADLINE = 180  # 后台请求默认总耗时上限（秒）
+    
+    # 客户端限流默认配置（每个后端地址，可通过构造参数覆盖，显式传 0 表示不限制）
+    RATE_LIMIT = 50  # 令牌补充速率（请求/秒）
+    RATE_BURST = 0  # 令牌桶容量（0 表示取速率的 2 倍）
+    MAX_CONCURRENCY = 16  # 最大并发请求数，占满时 background 请求为排队的 interactive 请求让行
+    BACKGROUND_CONCURRENCY = 4  # 推送等后台请求的最大并发数
+    
+    # 对冲请求配置（仅用于显式开启 hedge 的幂等 GET）
+    HEDGE_BUDGET_RATIO = 0.1  # 对冲请求最多占可对冲请求的比例
+    HEDGE_DEFAULT_DELAY = 1.0  # 样本不足时的对冲等待时间（秒）
+    HEDGE_MIN_DELAY = 0.05  # 对冲等待时间下限（秒）
+    
+    # 响应缓存策略: 路径 -> (新鲜期秒数, 过期后可返回旧数据的宽限期秒数)
+    STATIC_CACHE = (6 * 3600, 24 * 3600)  # 干员、地图、标签等静态数据
+    SEMI_STATIC_CACHE = (10 * 60, 3600)  # 文章列表等半静态数据
+    DAILY_CACHE = (30 * 60, 2 * 3600)  # 每日密码
+    PROFIT_CACHE = (2 * 60, 10 * 60)  # 利润排行（多个指令共享）
+    CACHE_POLICIES = {
+        "/df/object/operator": STATIC_CACHE,
+        "/df/object/maps": STATIC_CACHE,
+        "/df/tools/Room/tags": STATIC_CACHE,
+        "/df/tools/Room/maps": STATIC_CACHE,
+        "/df/audio/tags": STATIC_CACHE,
+        "/df/audio/categories": STATIC_CACHE,
+        "/df/audio/characters": STATIC_CACHE,
+        "/df/tts/presets": STATIC_CACHE,
+        "/df/person/ai/presets": STATIC_CACHE,
+        "/df/tools/article/list": SEMI_STATIC_CACHE,
+        "/df/tools/dailykeyword": DAILY_CACHE,
+        "/df/place/profitRank/v1": PROFIT_CACHE,
+        "/df/place/profitRank/v2": PROFIT_CACHE,
+    }
+    CACHE_MAX_SIZE = 256
+    
+    METRICS_DUMP_INTERVAL = 60  # Prometheus 指标文件写入间隔（秒）
+    
+    # 响应体读取配置
+    MAX_BODY_SIZE = 16 * 1024 * 1024  # 默认响应体大小上限（字节）
+    READ_CHUNK_SIZE = 64 * 1024  # 流式读取的分块大小（字节）
+    
+    # 分页预取配置（流水、战绩等按用户 token 分页的接口）
+    PREFETCH_TTL = 180  # 预取页缓存时间（秒）
+    PREFETCH_MAX_SIZE = 128  # 预取页缓存条目上限
+    
     def __init__(self, token: str, clientid: str, api_mode: str = "auto", 
-                 timeout: int = 30, retry_count: int = 3):
+                 timeout: int = 30, retry_count: int = 3, deadline: int = 40,
+                 metrics_file: str = "", max_body_size: int = 0,
+                 rate_limit: float = RATE_LIMIT, rate_burst: int = RATE_BURST,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 background_concurrency: int = BACKGROUND_CONCURRENCY):
         """
         初始化 API 客户端
         
@@ -110,10 +857,302 @@ class DeltaForceAPI:
             api_mode: API模式 ('auto' | 'default' | 'eo' | 'esa')
             timeout: 请求超时时间（秒）
             retry_count: 重试次数
+            deadline: 聊天命令单次调用的总耗时上限（秒），包含重试和地址切换
+            metrics_file: Prometheus 文本格式指标文件路径，为空则不写入
+            max_body_size: 响应体大小上限（字节），0 表示使用默认值
+            rate_limit: 每个后端地址的请求速率上限（请求/秒），0 表示不限速
+            rate_burst: 每个后端地址的突发请求数，0 表示取速率的 2 倍
+            max_concurrency: 每个后端地址的最大并发请求数，0 表示不限制
+            background_concurrency: 每个后端地址推送等后台请求的最大并发数，0 表示不限制
         """
         self.token = token
         self.clientid = clientid
+        self.interactive_deadline = deadline
+        self.max_body_size = max_body_size or self.MAX_BODY_SIZE
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        self.max_concurrency = max_concurrency
+        self.background_concurrency = background_concurrency
         self.url_manager = ApiUrlManager(mode=api_mode, timeout=timeout, retry_count=retry_count)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.cache = ResponseCache(max_size=self.CACHE_MAX_SIZE)
+        # 正在后台刷新的缓存键，避免重复刷新
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        # 正在进行中的 GET 请求，相同请求合并为一次（single-flight）
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._probe_task: Optional[asyncio.Task] = None
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._hedge_budget = HedgeBudget(ratio=self.HEDGE_BUDGET_RATIO)
+        self._gates: Dict[str, PriorityGate] = {}
+        # 按物品ID查询的微批量器
+        self._search_batcher = MicroBatcher(self._search_object_by_ids, "keywords")
+        self._price_batcher = MicroBatcher(self._get_current_price_by_ids, "prices")
+        # 按接口统计的调用指标
+        self.metrics = ApiMetrics()
+        self.metrics_file = metrics_file
+        self._metrics_task: Optional[asyncio.Task] = None
+        # 预取的分页结果: 键 -> (过期时间, 结果)，键包含 token
+        self._page_cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._prefetch_tasks: Dict[str, asyncio.Task] = {}
+        # token 过期（ret: 101）回调，参数为过期的 frameworkToken
+        self._token_expired_listeners: List[Callable[[str], None]] = []
+    
+    @staticmethod
+    @contextmanager
+    def priority(level: str):
+        """
+        标记当前上下文中 API 请求的优先级，推送等后台任务应使用:
+            with self.api.priority(PRIORITY_BACKGROUND): ...
+        """
+        token = _request_priority.set(level)
+        try:
+            yield
+        finally:
+            _request_priority.reset(token)
+    
+    @staticmethod
+    @contextmanager
+    def deadline(seconds: float):
+        """
+        为当前上下文中的 API 请求设置总耗时上限（与外层截止时间取较早者）:
+            with self.api.deadline(10): ...
+        """
+        new_deadline = time.monotonic() + seconds
+        current = _request_deadline.get()
+        if current is not None:
+            new_deadline = min(current, new_deadline)
+        token = _request_deadline.set(new_deadline)
+        try:
+            yield
+        finally:
+            _request_deadline.reset(token)
+    
+    def _resolve_deadline(self) -> float:
+        """当前请求的截止时间：显式设置优先，否则按优先级取默认值"""
+        deadline = _request_deadline.get()
+        if deadline is not None:
+            return deadline
+        if _request_priority.get() == PRIORITY_BACKGROUND:
+            return time.monotonic() + self.BACKGROUND_DEADLINE
+        return time.monotonic() + self.interactive_deadline
+    
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """指数退避 + 完全抖动，服务端给出 Retry-After 时不早于该时间"""
+        delay = random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * (2 ** (attempt - 1))))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """解析 Retry-After 头（仅支持秒数格式）"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+    
+    def _get_gate(self, base_url: str) -> PriorityGate:
+        """获取（或创建）后端地址的限流闸门"""
+        gate = self._gates.get(base_url)
+        if gate is None:
+            gate = PriorityGate(self.rate_limit, self.rate_burst,
+                                self.max_concurrency, self.background_concurrency)
+            self._gates[base_url] = gate
+        return gate
+    
+    async def start(self):
+        """创建长连接会话并启动后端健康探测（插件初始化时调用）"""
+        await self._get_session()
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._health_probe_loop())
+        if self.metrics_file and (self._metrics_task is None or self._metrics_task.done()):
+            self._metrics_task = asyncio.create_task(self._metrics_dump_loop())
+    
+    async def close(self):
+        """关闭长连接会话（插件销毁时调用）"""
+        if self._probe_task:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+            self.dump_metrics()
+        for task in list(self._refresh_tasks) + list(self._inflight.values()) + list(self._prefetch_tasks.values()):
+            task.cancel()
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("[DeltaForceAPI] 连接池已关闭")
+        self._session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的连接池会话，未创建或已关闭时自动重建"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.POOL_LIMIT,
+                limit_per_host=self.POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=self.DNS_CACHE_TTL,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            logger.info("[DeltaForceAPI] 已创建连接池会话")
+        return self._session
+    
+    async def probe_mirror(self, base_url: str) -> Optional[float]:
+        """
+        探测单个后端地址的健康状态，并计入地址质量统计
+        
+        Returns:
+            成功时返回延迟（秒），失败返回 None
+        """
+        timeout = aiohttp.ClientTimeout(total=self.HEALTH_PROBE_TIMEOUT)
+        started = time.monotonic()
+        try:
+            session = await self._get_session()
+            async with session.get(f"{base_url}{self.HEALTH_PROBE_PATH}", timeout=timeout) as response:
+                await response.read()
+                if response.status >= 500:
+                    self.url_manager.record_failure(base_url)
+                    return None
+            latency = time.monotonic() - started
+            self.url_manager.record_success(base_url, latency)
+            return latency
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.debug(f"[ApiUrlManager] 健康探测失败 {base_url}: {e}")
+            self.url_manager.record_failure(base_url)
+            return None
+    
+    async def _health_probe_loop(self):
+        """后台定期探测所有后端地址（仅 auto 模式，首次探测由 warm_up 完成）"""
+        while True:
+            await asyncio.sleep(self.HEALTH_PROBE_INTERVAL)
+            try:
+                if self.url_manager.mode == "auto":
+                    await asyncio.gather(
+                        *(self.probe_mirror(url) for url in self.url_manager.get_candidate_urls())
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[ApiUrlManager] 健康探测异常: {e}")
+    
+    # 启动预热时预加载的静态数据接口
+    WARMUP_PRELOAD = ("get_operators", "get_maps", "get_room_tags", "get_room_maps",
+                      "get_tts_presets", "get_ai_presets")
+    
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        启动预热（插件初始化时在后台调用）:
+        1. 探测所有后端地址，建立连接（DNS 解析 + TCP/TLS 握手进入连接池）并测得初始延迟用于排序
+        2. 并发预加载静态数据到响应缓存
+        
+        Returns:
+            {"mirrors": {地址: 延迟秒数或 None}, "preloaded": 成功预加载数}
+        """
+        started = time.monotonic()
+        with self.priority(PRIORITY_BACKGROUND):
+            urls = list(dict.fromkeys(self.url_manager.URLS.values()))
+            latencies = await asyncio.gather(*(self.probe_mirror(url) for url in urls))
+            mirrors = dict(zip(urls, latencies))
+            
+            results = await asyncio.gather(
+                *(getattr(self, name)() for name in self.WARMUP_PRELOAD), return_exceptions=True
+            )
+        preloaded = sum(1 for result in results if self._is_cacheable(result))
+        
+        reachable = ", ".join(
+            f"{url} {latency * 1000:.0f}ms" if latency is not None else f"{url} 不可用"
+            for url, latency in mirrors.items()
+        )
+        logger.info(f"[DeltaForceAPI] 预热完成 ({time.monotonic() - started:.1f}s): {reachable}；"
+                    f"预加载静态数据 {preloaded}/{len(self.WARMUP_PRELOAD)}")
+        return {"mirrors": mirrors, "preloaded": preloaded}
+    
+    def dump_metrics(self):
+        """写入 Prometheus 指标文件"""
+        try:
+            self.metrics.dump(self.metrics_file)
+        except OSError as e:
+            logger.warning(f"[DeltaForceAPI] 写入指标文件失败 {self.metrics_file}: {e}")
+    
+    async def _metrics_dump_loop(self):
+        """后台定期写入指标文件"""
+        while True:
+            await asyncio.sleep(self.METRICS_DUMP_INTERVAL)
+            self.dump_metrics()
+    
+    @staticmethod
+    def endpoint_family(url: str) -> str:
+        """接口族：取路径前两段，如 /df/person/record -> /df/person"""
+        segments = [seg for seg in url.split("/") if seg]
+        return "/" + "/".join(segments[:2])
+    
+    def _get_breaker(self, base_url: str, family: str = "") -> CircuitBreaker:
+        """获取（或创建）熔断器，family 为空表示地址级熔断器"""
+        key = (base_url, family)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            threshold = self.ENDPOINT_BREAKER_THRESHOLD if family else self.MIRROR_BREAKER_THRESHOLD
+            breaker = CircuitBreaker(threshold, self.BREAKER_OPEN_DURATION)
+            self._breakers[key] = breaker
+        return breaker
+    
+    def _breaker_allows(self, base_url: str, family: str) -> bool:
+        """地址级与接口族级熔断器都放行时才允许请求"""
+        mirror_breaker = self._get_breaker(base_url)
+        if not mirror_breaker.allow_request():
+            return False
+        if not self._get_breaker(base_url, family).allow_request():
+            mirror_breaker.release_probe()
+            return False
+        return True
+    
+    def _breaker_record(self, base_url: str, family: str, success: bool):
+        """记录请求结果到熔断器"""
+        for breaker in (self._get_breaker(base_url), self._get_breaker(base_url, family)):
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+    
+    def _breaker_is_open(self, base_url: str, family: str) -> bool:
+        return self._get_breaker(base_url).is_open or self._get_breaker(base_url, family).is_open
+    
+    def get_breaker_status(self) -> List[Dict[str, Any]]:
+        """获取非关闭状态的熔断器列表"""
+        return [
+            {"url": url, "family": family or "*", "state": breaker.state, "failures": breaker.failures}
+            for (url, family), breaker in self._breakers.items()
+            if breaker.state != CircuitBreaker.CLOSED
+        ]
+    
+    # 接口返回该 ret 值表示 frameworkToken 已过期
+    TOKEN_EXPIRED_RET = 101
+    
+    def add_token_expired_listener(self, callback: Callable[[str], None]):
+        """注册 token 过期回调（重复注册同一回调只保留一个）"""
+        if callback not in self._token_expired_listeners:
+            self._token_expired_listeners.append(callback)
+    
+    def _notify_token_expired(self, params: Optional[Dict], json_data: Optional[Dict], result: Dict):
+        """响应表明 token 过期时通知回调"""
+        if not isinstance(result, dict):
+            return
+        data = result.get("data")
+        ret = result.get("ret", data.get("ret") if isinstance(data, dict) else None)
+        if str(ret) != str(self.TOKEN_EXPIRED_RET):
+            return
+        for source in (params, json_data):
+            for name in ResponseCache.TOKEN_PARAMS:
+                token = source.get(name) if isinstance(source, dict) else None
+                if token:
+                    for callback in self._token_expired_listeners:
+                        try:
+                            callback(token)
+                        except Exception as e:
+                            logger.warning(f"[DeltaForceAPI] token 过期回调异常: {e}")
     
     def set_api_mode(self, mode: str):
         """设置API模式"""
@@ -121,11 +1160,121 @@ class DeltaForceAPI:
     
     def get_api_status(self) -> Dict[str, Any]:
         """获取API状态信息"""
-        return self.url_manager.get_status()
+        status = self.url_manager.get_status()
+        status["breakers"] = self.get_breaker_status()
+        status["hedged_requests"] = self._hedge_budget.hedged
+        status["gates"] = {url: gate.get_status() for url, gate in self._gates.items()}
+        return status
+    
+    def clear_cache(self) -> int:
+        """清空响应缓存，返回清除的条目数"""
+        count = self.cache.clear()
+        logger.info(f"[DeltaForceAPI] 已清空响应缓存 ({count} 条)")
+        return count
+    
+    @staticmethod
+    def _is_cacheable(result: Dict) -> bool:
+        """仅缓存业务成功的响应"""
+        if not isinstance(result, dict):
+            return False
+        if "success" in result:
+            return result.get("success") is True
+        return result.get("code") in (0, 200, "0")
+    
+    async def _request(self, method: str, url: str, params: Optional[Dict] = None,
+                       json_data: Optional[Dict] = None, form_data: Optional[Dict] = None,
+                       auth: bool = True, hedge: bool = False) -> Dict:
+        """
+        请求入口：命中缓存策略的接口先查缓存，再发起真实请求，并记录接口指标
+        """
+        metrics = self.metrics.endpoint(url)
+        metrics.inflight += 1
+        started = time.monotonic()
+        result = None
+        try:
+            result = await self._cached_request(metrics, method, url, params, json_data, form_data, auth, hedge)
+            self._notify_token_expired(params, json_data or form_data, result)
+            return result
+        finally:
+            metrics.inflight -= 1
+            metrics.observe(time.monotonic() - started, error=result is None or not self._is_usable(result))
+    
+    async def _cached_request(self, metrics: EndpointMetrics, method: str, url: str, params: Optional[Dict],
+                              json_data: Optional[Dict], form_data: Optional[Dict],
+                              auth: bool, hedge: bool) -> Dict:
+        """按缓存策略处理请求"""
+        policy = self.CACHE_POLICIES.get(url)
+        if not policy or form_data:
+            return await self._single_flight(method, url, params=params, json_data=json_data,
+                                             form_data=form_data, auth=auth, hedge=hedge)
+        
+        key = ResponseCache.make_key(method, url, params, json_data)
+        cached, is_fresh = self.cache.get(key)
+        if cached is not None:
+            metrics.cache_hits += 1
+            if not is_fresh:
+                self._schedule_refresh(key, policy, method, url, params, json_data, auth)
+            return cached
+        
+        metrics.cache_misses += 1
+        result = await self._single_flight(method, url, params=params, json_data=json_data, auth=auth)
+        if self._is_cacheable(result):
+            self.cache.set(key, result, *policy)
+        return result
+    
+    def _flight_key(self, method: str, url: str, params: Optional[Dict], auth: bool) -> str:
+        """生成请求合并键：方法 + 路径 + 参数（含令牌）+ 鉴权身份"""
+        params_key = json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+        auth_key = self.token if auth and self.token else ""
+        return f"{method.upper()}|{url}|{params_key}|{auth_key}"
+    
+    async def _single_flight(self, method: str, url: str, params: Optional[Dict] = None,
+                             json_data: Optional[Dict] = None, form_data: Optional[Dict] = None,
+                             auth: bool = True, hedge: bool = False) -> Dict:
+        """
+        合并相同的进行中请求：同一时刻相同的 GET 只向后端发送一次，
+        后到的调用方等待同一个结果。POST 请求不做合并。
+        """
+        if method.upper() != "GET":
+            return await self._make_request(method, url, params=params, json_data=json_data,
+                                            form_data=form_data, auth=auth)
+        
+        key = self._flight_key(method, url, params, auth)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._make_request(method, url, params=params, auth=auth, hedge=hedge))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug(f"[DeltaForceAPI] 合并进行中的请求: {url}")
+        # shield: 单个调用方被取消时不影响其他等待者
+        return await asyncio.shield(task)
+    
+    def _schedule_refresh(self, key: str, policy: Tuple[float, float], method: str, url: str,
+                          params: Optional[Dict], json_data: Optional[Dict], auth: bool):
+        """后台刷新过期缓存"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        
+        async def refresh():
+            _request_priority.set(PRIORITY_BACKGROUND)
+            try:
+                result = await self._single_flight(method, url, params=params, json_data=json_data, auth=auth)
+                if self._is_cacheable(result):
+                    self.cache.set(key, result, *policy)
+            except Exception as e:
+                logger.warning(f"[DeltaForceAPI] 后台刷新缓存失败 {url}: {e}")
+            finally:
+                self._refreshing.discard(key)
+        
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
     
     async def _make_request(self, method: str, url: str, params: Optional[Dict] = None,
                             json_data: Optional[Dict] = None, form_data: Optional[Dict] = None,
-                            auth: bool = True) -> Dict:
+                            auth: bool = True, hedge: bool = False) -> Dict:
         """
         统一的请求方法，支持自动重试和故障转移
         
@@ -136,6 +1285,7 @@ class DeltaForceAPI:
             json_data: JSON请求体
             form_data: 表单数据
             auth: 是否需要鉴权 Header
+            hedge: 是否启用对冲请求（仅 GET 生效）
         
         Returns:
             API响应结果
@@ -153,89 +1303,214 @@ class DeltaForceAPI:
             self.url_manager.reset_failures()
             available_urls = self.url_manager.get_available_urls()
         
+        deadline = self._resolve_deadline()
+        
+        if hedge and method.upper() == "GET" and len(available_urls) > 1:
+            return await self._hedged_request(url, available_urls, headers, params, deadline)
+        
+        return await self._request_mirrors(method, url, available_urls, headers, deadline,
+                                           params=params, json_data=json_data, form_data=form_data)
+    
+    def _hedge_delay(self, base_url: str) -> float:
+        """对冲等待时间：主地址最近延迟的 p95"""
+        stats = self.url_manager.stats.get(base_url)
+        p95 = stats.percentile(0.95) if stats else None
+        if p95 is None:
+            p95 = self.HEDGE_DEFAULT_DELAY
+        return min(max(p95, self.HEDGE_MIN_DELAY), self.url_manager.timeout)
+    
+    @staticmethod
+    def _is_usable(result: Dict) -> bool:
+        """对冲时判断结果是否可直接返回（非 5xx 且非全部失败）"""
+        code = result.get("code", 0) if isinstance(result, dict) else -1
+        return not (code == -1 or (isinstance(code, int) and 500 <= code < 600))
+    
+    async def _hedged_request(self, url: str, available_urls: List[str], headers: Dict,
+                              params: Optional[Dict], deadline: float) -> Dict:
+        """
+        对冲请求：主地址超过 p95 延迟仍未响应时，向下一个地址发送相同的 GET，
+        取先返回的可用结果并取消另一个请求
+        """
+        self._hedge_budget.deposit()
+        primary = asyncio.create_task(
+            self._request_mirrors("GET", url, available_urls, headers, deadline, params=params)
+        )
+        pending = {primary}
+        result = None
+        # 两个等待阶段共用同一个 finally：任一阶段被取消时都会取消仍在进行的请求，释放闸门占用
+        try:
+            hedge_delay = min(self._hedge_delay(available_urls[0]), max(0.0, deadline - time.monotonic()))
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done or not self._hedge_budget.try_acquire():
+                return await primary
+            
+            logger.debug(f"[ApiUrlManager] 主地址响应较慢，对冲请求: {url} -> {available_urls[1]}")
+            secondary = asyncio.create_task(
+                self._request_mirrors("GET", url, available_urls[1:], headers, deadline, params=params)
+            )
+            pending = {primary, secondary}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if self._is_usable(result):
+                        return result
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _request_mirrors(self, method: str, url: str, available_urls: List[str], headers: Dict,
+                               deadline: float, params: Optional[Dict] = None,
+                               json_data: Optional[Dict] = None, form_data: Optional[Dict] = None) -> Dict:
+        """
+        按顺序在各后端地址上重试请求
+        每次尝试的超时不超过剩余的截止时间，截止时间耗尽后立即返回
+        """
         last_error = None
         last_result = None
+        family = self.endpoint_family(url)
+        metrics = self.metrics.endpoint(url)
         
         # 遍历所有可用地址
-        for base_url in available_urls:
+        for index, base_url in enumerate(available_urls):
+            if deadline - time.monotonic() <= 0:
+                break
+            if index > 0:
+                metrics.failovers += 1
+            
+            # 熔断中的地址直接跳过，立即切换到下一个地址
+            if not self._breaker_allows(base_url, family):
+                last_error = f"地址 {base_url} 熔断中"
+                logger.debug(f"[ApiUrlManager] 地址 {base_url} ({family}) 熔断中，跳过")
+                continue
+            
             # 对当前地址重试指定次数
             for attempt in range(1, self.url_manager.retry_count + 1):
+                retry_after = None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                attempt_timeout = min(self.url_manager.timeout, remaining)
+                if attempt > 1:
+                    metrics.retries += 1
                 try:
                     full_url = f"{base_url}{url}"
-                    timeout = aiohttp.ClientTimeout(total=self.url_manager.timeout)
+                    timeout = aiohttp.ClientTimeout(total=attempt_timeout)
+                    session = await self._get_session()
                     
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
-                        if method.upper() == "GET":
-                            async with session.get(full_url, headers=headers, params=params) as response:
-                                result = await self._handle_response(response)
-                                # 请求成功（业务成功）
-                                if result.get("code") == 200 or result.get("code") == 0:
-                                    logger.debug(f"[ApiUrlManager] 请求成功: {base_url}")
-                                    return result
-                                # 5xx服务器错误，应该重试和切换地址
-                                status_code = result.get("code", 0)
-                                if 500 <= status_code < 600:
-                                    last_error = f"服务器错误 ({status_code})"
-                                    last_result = result
-                                    logger.warning(f"[ApiUrlManager] 地址 {base_url} 第 {attempt} 次请求返回 {status_code}")
-                                    # 继续重试，不直接返回
-                                    raise ServerError(status_code, result.get("msg", "服务器错误"))
-                                # 其他非5xx错误（如400、401、403、404等），直接返回，不重试
-                                return result
-                        else:  # POST
-                            async with session.post(full_url, headers=headers, 
-                                                   json=json_data, data=form_data) as response:
-                                result = await self._handle_response(response)
-                                # 请求成功（业务成功）
-                                if result.get("code") == 200 or result.get("code") == 0:
-                                    logger.debug(f"[ApiUrlManager] 请求成功: {base_url}")
-                                    return result
-                                # 5xx服务器错误，应该重试和切换地址
-                                status_code = result.get("code", 0)
-                                if 500 <= status_code < 600:
-                                    last_error = f"服务器错误 ({status_code})"
-                                    last_result = result
-                                    logger.warning(f"[ApiUrlManager] 地址 {base_url} 第 {attempt} 次请求返回 {status_code}")
-                                    # 继续重试，不直接返回
-                                    raise ServerError(status_code, result.get("msg", "服务器错误"))
-                                # 其他非5xx错误（如400、401、403、404等），直接返回，不重试
+                    async with self._get_gate(base_url).slot(_request_priority.get(), deadline):
+                        started = time.monotonic()
+                        async with session.request(
+                            method.upper(), full_url, headers=headers, params=params,
+                            json=json_data, data=form_data, timeout=timeout
+                        ) as response:
+                            result = await self._handle_response(response, metrics)
+                            status_code = result.get("code", 0)
+                            if response.status in self.RETRY_AFTER_STATUSES:
+                                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                            # 5xx服务器错误，应该重试和切换地址
+                            if isinstance(status_code, int) and 500 <= status_code < 600:
+                                self.url_manager.record_failure(base_url)
+                                self._breaker_record(base_url, family, success=False)
+                            elif status_code == 429:
+                                # 被限流：地址本身可用，不计入熔断，但降低排序优先级
+                                self.url_manager.record_failure(base_url)
+                            else:
+                                self.url_manager.record_success(base_url, time.monotonic() - started)
+                                self._breaker_record(base_url, family, success=True)
+                            # 请求成功（业务成功）
+                            if result.get("code") == 200 or result.get("code") == 0:
+                                logger.debug(f"[ApiUrlManager] 请求成功: {base_url}")
                                 return result
+                            if status_code == 429 or (isinstance(status_code, int) and 500 <= status_code < 600):
+                                last_error = f"服务器错误 ({status_code})"
+                                last_result = result
+                                logger.warning(f"[ApiUrlManager] 地址 {base_url} 第 {attempt} 次请求返回 {status_code}")
+                                # 继续重试，不直接返回
+                                raise ServerError(status_code, result.get("msg", "服务器错误"))
+                            # 其他4xx错误（如400、401、403、404等），直接返回，不重试
+                            return result
                 
                 except ServerError as e:
                     last_error = str(e)
-                    # ServerError表示5xx错误，继续重试逻辑
+                    # ServerError表示5xx/429错误，继续重试逻辑
+                except DeadlineExceeded:
+                    last_error = "请求排队超时"
+                    break
                 except asyncio.TimeoutError:
-                    last_error = f"请求超时 ({self.url_manager.timeout}s)"
+                    self.url_manager.record_failure(base_url)
+                    self._breaker_record(base_url, family, success=False)
+                    last_error = f"请求超时 ({attempt_timeout:.1f}s)"
                     logger.warning(f"[ApiUrlManager] 地址 {base_url} 第 {attempt} 次请求超时")
                 except aiohttp.ClientError as e:
+                    self.url_manager.record_failure(base_url)
+                    self._breaker_record(base_url, family, success=False)
                     last_error = str(e)
                     logger.warning(f"[ApiUrlManager] 地址 {base_url} 第 {attempt} 次请求失败: {e}")
                 except Exception as e:
-                    # 避免捕获ServerError以外的自定义异常
-                    if isinstance(e, ServerError):
-                        last_error = str(e)
-                    else:
-                        last_error = str(e)
-                        logger.warning(f"[ApiUrlManager] 地址 {base_url} 第 {attempt} 次请求异常: {e}")
+                    last_error = str(e)
+                    logger.warning(f"[ApiUrlManager] 地址 {base_url} 第 {attempt} 次请求异常: {e}")
+                
+                # 熔断器已打开，不再重试当前地址
+                if self._breaker_is_open(base_url, family):
+                    logger.warning(f"[ApiUrlManager] 地址 {base_url} ({family}) 已熔断，立即切换")
+                    break
                 
-                # 如果不是最后一次重试，等待后继续
+                # 如果不是最后一次重试，退避后继续；退避会超过截止时间则直接切换地址
                 if attempt < self.url_manager.retry_count:
-                    await asyncio.sleep(0.5 * attempt)  # 递增等待时间
+                    delay = self._backoff_delay(attempt, retry_after)
+                    if delay >= deadline - time.monotonic():
+                        break
+                    await asyncio.sleep(delay)
+            
+            if deadline - time.monotonic() <= 0:
+                break
             
-            # 当前地址所有重试都失败，标记为失败并尝试下一个地址
-            logger.error(f"[ApiUrlManager] 地址 {base_url} 重试 {self.url_manager.retry_count} 次后仍然失败")
-            self.url_manager.mark_url_failed(base_url)
+            # 当前地址所有重试都失败，尝试下一个地址
+            # 仅接口族熔断时不标记整个地址失败，其他接口仍可使用该地址
+            logger.error(f"[ApiUrlManager] 地址 {base_url} 重试后仍然失败")
+            if self._get_breaker(base_url).is_open or not self._get_breaker(base_url, family).is_open:
+                self.url_manager.mark_url_failed(base_url)
             logger.info(f"[ApiUrlManager] 切换到下一个可用地址")
         
+        if deadline - time.monotonic() <= 0:
+            logger.warning(f"[ApiUrlManager] 请求 {url} 已超过截止时间")
+            last_error = f"{last_error or '请求超时'}（已超过总耗时上限）"
+        
         # 所有地址都失败
         if last_result:
             return last_result
         return {"code": -1, "msg": f"所有 API 地址都请求失败: {last_error}", "data": None}
     
-    async def _handle_response(self, response: aiohttp.ClientResponse) -> Dict:
-        """处理响应"""
+    async def _read_body(self, response: aiohttp.ClientResponse) -> bytes:
+        """流式读取响应体，超过大小上限时立即中止"""
+        limit = self.max_body_size
+        if response.content_length is not None and response.content_length > limit:
+            raise ResponseTooLarge(response.content_length, limit)
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(self.READ_CHUNK_SIZE):
+            size += len(chunk)
+            if size > limit:
+                raise ResponseTooLarge(size, limit)
+            chunks.append(chunk)
+        return b"".join(chunks)
+    
+    async def _handle_response(self, response: aiohttp.ClientResponse,
+                               metrics: Optional[EndpointMetrics] = None) -> Dict:
+        """处理响应：响应体只读取一次，直接从 bytes 解码 JSON"""
+        try:
+            body = await self._read_body(response)
+        except ResponseTooLarge as e:
+            logger.warning(f"[ApiUrlManager] {response.url} {e}")
+            # 按上游异常处理，触发重试和地址切换
+            return {"code": 502, "msg": str(e), "data": None}
+        if metrics is not None:
+            metrics.bytes_received += len(body)
+        
         if response.status != 200:
-            text = await response.text()
+            text = body.decode(response.charset or "utf-8", errors="replace")
             if "<html" in text.lower() or "<!doctype" in text.lower():
                 error_msg = f"服务器错误 ({response.status})"
             else:
@@ -243,22 +1518,103 @@ class DeltaForceAPI:
             return {"code": response.status, "msg": error_msg, "data": None}
         
         try:
-            return await response.json()
-        except (aiohttp.ContentTypeError, json.JSONDecodeError):
-            text = await response.text()
+            return json_loads(body)
+        except ValueError:
+            text = body.decode(response.charset or "utf-8", errors="replace")
             if "<html" in text.lower() or "<!doctype" in text.lower():
                 error_msg = "服务器返回了无效响应"
             else:
                 error_msg = f"响应格式错误: {text[:100]}"
             return {"code": response.status, "msg": error_msg, "data": None}
     
-    async def req_get(self, url: str, params: Optional[Dict] = None, auth: bool = True) -> Dict:
-        """GET 请求"""
-        return await self._make_request("GET", url, params=params, auth=auth)
+    @staticmethod
+    def _page_key(url: str, params: Dict, page: int) -> str:
+        """分页缓存键：路径 + 参数（含 token）+ 页码"""
+        return f"{url}|{json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)}|{page}"
+    
+    @staticmethod
+    def _page_has_items(result: Dict) -> bool:
+        """判断分页结果是否成功且非空（data 为列表或含 list 字段的字典）"""
+        if not DeltaForceAPI._is_cacheable(result):
+            return False
+        data = result.get("data")
+        if isinstance(data, dict):
+            data = data.get("list")
+        return bool(data)
+    
+    def _get_prefetched(self, key: str) -> Optional[Dict]:
+        entry = self._page_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._page_cache.pop(key, None)
+            return None
+        return entry[1]
+    
+    def _store_prefetched(self, key: str, result: Dict):
+        self._page_cache[key] = (time.monotonic() + self.PREFETCH_TTL, result)
+        self._page_cache.move_to_end(key)
+        while len(self._page_cache) > self.PREFETCH_MAX_SIZE:
+            self._page_cache.popitem(last=False)
+    
+    def _prefetch_page(self, url: str, params: Dict, page: int):
+        """后台预取指定页（已缓存或正在预取时跳过）"""
+        key = self._page_key(url, params, page)
+        if key in self._prefetch_tasks or self._get_prefetched(key) is not None:
+            return
+        
+        async def prefetch() -> Dict:
+            # 预取不继承调用方的截止时间，按后台请求处理
+            _request_priority.set(PRIORITY_BACKGROUND)
+            _request_deadline.set(None)
+            try:
+                result = await self.req_get(url, params={**params, "page": page})
+            except Exception as e:
+                logger.debug(f"[DeltaForceAPI] 预取分页失败 {url} 第{page}页: {e}")
+                return {"code": -1, "msg": f"预取失败: {e}", "data": None}
+            if self._is_cacheable(result):
+                self._store_prefetched(key, result)
+            return result
+        
+        task = asyncio.create_task(prefetch())
+        self._prefetch_tasks[key] = task
+        task.add_done_callback(lambda _: self._prefetch_tasks.pop(key, None))
+    
+    async def _get_page(self, url: str, params: Dict, page: int, hedge: bool = False) -> Dict:
+        """
+        获取一页数据：优先使用预取结果，返回非空页后在后台预取下一页
+        """
+        key = self._page_key(url, params, page)
+        result = self._get_prefetched(key)
+        if result is None:
+            task = self._prefetch_tasks.get(key)
+            if task is not None:
+                result = await asyncio.shield(task)
+            else:
+                result = await self.req_get(url, params={**params, "page": page}, hedge=hedge)
+        if self._page_has_items(result):
+            self._prefetch_page(url, params, page + 1)
+        return result
+    
+    async def _iter_pages(self, url: str, params: Dict, start_page: int = 1,
+                          max_pages: int = 0, hedge: bool = False) -> AsyncIterator[Dict]:
+        """逐页迭代（每返回一页即预取下一页），遇到失败或空页后结束"""
+        page = start_page
+        while not max_pages or page < start_page + max_pages:
+            result = await self._get_page(url, params, page, hedge=hedge)
+            yield result
+            if not self._page_has_items(result):
+                return
+            page += 1
+    
+    async def req_get(self, url: str, params: Optional[Dict] = None, auth: bool = True,
+                      hedge: bool = False) -> Dict:
+        """GET 请求（hedge=True 时对延迟敏感的查询启用对冲请求）"""
+        return await self._request("GET", url, params=params, auth=auth, hedge=hedge)
     
     async def req_post(self, url: str, json: Optional[Dict] = None, data: Optional[Dict] = None, auth: bool = True) -> Dict:
         """POST 请求"""
-        return await self._make_request("POST", url, json_data=json, form_data=data, auth=auth)
+        return await self._request("POST", url, json_data=json, form_data=data, auth=auth)
 
     ################################################################
     async def user_bind(self, platformId:str, frameworkToken:str):
@@ -386,7 +1742,8 @@ class DeltaForceAPI:
             url="/df/person/money",
             params = {
                 "frameworkToken": frameworkToken
-            }
+            },
+            hedge=True
         )
 
     async def get_personal_info(self, frameworkToken: str, seasonid: str = ""):
@@ -396,7 +1753,8 @@ class DeltaForceAPI:
             params["seasonid"] = seasonid
         return await self.req_get(
             url="/df/person/personalinfo",
-            params=params
+            params=params,
+            hedge=True
         )
 
     async def get_personal_data(self, frameworkToken: str, mode: str = "", season: str = "7"):
@@ -408,16 +1766,20 @@ class DeltaForceAPI:
             params["seasonid"] = season
         return await self.req_get(url="/df/person/PersonalData", params=params)
 
-    async def get_flows(self, frameworkToken: str, flow_type: int, page: int = 1):
-        """获取流水记录"""
-        return await self.req_get(
-            url="/df/person/flows",
-            params={
-                "frameworkToken": frameworkToken,
-                "type": flow_type,
-                "page": page
-            }
-        )
+    async def get_flows(self, frameworkToken: str, flow_type: int, page: int = 1, prefetch: bool = False):
+        """获取流水记录（prefetch=True 时后台预取下一页）"""
+        params = {"frameworkToken": frameworkToken, "type": flow_type}
+        if prefetch:
+            return await self._get_page("/df/person/flows", params, page)
+        return await self.req_get(url="/df/person/flows", params={**params, "page": page})
+
+    async def iter_flows(self, frameworkToken: str, flow_type: int,
+                         start_page: int = 1, max_pages: int = 0) -> AsyncIterator[Dict]:
+        """逐页迭代流水记录，返回当前页时后台预取下一页"""
+        async for result in self._iter_pages("/df/person/flows",
+                                             {"frameworkToken": frameworkToken, "type": flow_type},
+                                             start_page, max_pages):
+            yield result
 
     async def get_collection(self, frameworkToken: str):
         """获取个人藏品"""
@@ -437,16 +1799,20 @@ class DeltaForceAPI:
             params["mapId"] = map_id
         return await self.req_get(url="/df/person/mapStats", params=params)
 
-    async def get_record(self, frameworkToken: str, mode_type: int, page: int = 1):
-        """获取战绩记录"""
-        return await self.req_get(
-            url="/df/person/record",
-            params={
-                "frameworkToken": frameworkToken,
-                "type": mode_type,
-                "page": page
-            }
-        )
+    async def get_record(self, frameworkToken: str, mode_type: int, page: int = 1, prefetch: bool = False):
+        """获取战绩记录（prefetch=True 时后台预取下一页）"""
+        params = {"frameworkToken": frameworkToken, "type": mode_type}
+        if prefetch:
+            return await self._get_page("/df/person/record", params, page, hedge=True)
+        return await self.req_get(url="/df/person/record", params={**params, "page": page}, hedge=True)
+
+    async def iter_records(self, frameworkToken: str, mode_type: int,
+                           start_page: int = 1, max_pages: int = 0) -> AsyncIterator[Dict]:
+        """逐页迭代战绩记录，返回当前页时后台预取下一页"""
+        async for result in self._iter_pages("/df/person/record",
+                                             {"frameworkToken": frameworkToken, "type": mode_type},
+                                             start_page, max_pages, hedge=True):
+            yield result
 
     async def get_operators(self):
         """获取所有干员信息"""
@@ -457,7 +1823,9 @@ class DeltaForceAPI:
         return await self.req_get(url="/df/object/maps")
 
     async def search_object(self, keyword: str = "", object_ids: str = ""):
-        """搜索物品"""
+        """搜索物品（仅按ID查询时与并发请求合并批量发送）"""
+        if object_ids and not keyword:
+            return await self._search_batcher.load(object_ids.split(","))
         params = {}
         if keyword:
             params["name"] = keyword  # 修复: API参数应为 name 而非 keyword
@@ -465,18 +1833,20 @@ class DeltaForceAPI:
             params["id"] = object_ids
         return await self.req_get(url="/df/object/search", params=params)
 
+    async def _search_object_by_ids(self, ids: List[str]):
+        """按一组ID搜索物品（批量器的实际请求）"""
+        return await self.req_get(url="/df/object/search", params={"id": ",".join(ids)})
+
     async def get_current_price(self, object_ids: str):
-        """获取物品当前均价"""
-        import json
+        """获取物品当前均价（与并发请求合并批量发送）"""
+        return await self._price_batcher.load(object_ids.split(","))
+
+    async def _get_current_price_by_ids(self, ids: List[str]):
+        """按一组ID获取当前均价（批量器的实际请求）"""
         # API expects JSON array format like ["id1","id2"]
-        if "," in object_ids:
-            ids_list = [id.strip() for id in object_ids.split(",")]
-            id_param = json.dumps(ids_list)
-        else:
-            id_param = json.dumps([object_ids])
         return await self.req_get(
             url="/df/object/price/latest",
-            params={"id": id_param}
+            params={"id": json.dumps(ids)}
         )
 
     async def get_price_history(self, object_id: str):
@@ -0,0 +1,249 @@
+"""
+本地物品目录
+定期通过 get_object_list 同步全量物品到 SQLite，并在内存中建立 n-gram 索引（支持别名和拼音），
+名称/ID 查询优先本地命中，未命中时回退到远程搜索
+"""
+import asyncio
+import re
+import time
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from astrbot.api import logger
+
+from .df_api import PRIORITY_BACKGROUND
+
+# 拼音检索 (requirements.txt 中已声明，未安装时退化为仅按名称/别名检索)
+try:
+    from pypinyin import lazy_pinyin, Style
+    HAS_PYPINYIN = True
+except ImportError:
+    HAS_PYPINYIN = False
+
+if TYPE_CHECKING:
+    from .df_api import DeltaForceAPI
+    from .df_sqlite import DeltaForceSQLiteManager
+
+
+class ItemIndex:
+    """物品名称的 n-gram 倒排索引"""
+
+    MIN_OVERLAP = 0.6  # 模糊匹配时查询 n-gram 的最低命中比例
+    _STRIP_RE = re.compile(r"[\s\-_·・.,，。()（）\[\]【】'\"]+")
+
+    def __init__(self, items: List[Dict], aliases: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            items: 物品列表（get_object_list 返回的 keywords）
+            aliases: 别名 -> 物品全名
+        """
+        self.items: Dict[str, Dict] = {}
+        self._keys: Dict[str, Set[str]] = {}  # 检索键 -> 物品ID
+        self._grams: Dict[str, Set[str]] = {}  # n-gram -> 检索键
+
+        names: Dict[str, Set[str]] = {}
+        for item in items:
+            object_id = str(item.get("objectID", ""))
+            name = item.get("objectName") or item.get("name") or ""
+            if not object_id or not name:
+                continue
+            self.items[object_id] = item
+            key = self.normalize(name)
+            names.setdefault(key, set()).add(object_id)
+            self._add_key(key, object_id)
+            for pinyin_key in self._pinyin_keys(name):
+                self._add_key(pinyin_key, object_id)
+
+        for alias, name in (aliases or {}).items():
+            for object_id in names.get(self.normalize(name), ()):
+                self._add_key(self.normalize(alias), object_id)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """统一全半角、大小写并去除空白和标点"""
+        return cls._STRIP_RE.sub("", unicodedata.normalize("NFKC", str(text)).lower())
+
+    @staticmethod
+    def _query_grams(key: str) -> Set[str]:
+        """查询使用二元组，单字查询使用单字"""
+        if len(key) < 2:
+            return {key}
+        return {key[i:i + 2] for i in range(len(key) - 1)}
+
+    @staticmethod
+    def _pinyin_keys(name: str) -> List[str]:
+        """全拼和首字母检索键（未安装 pypinyin 时为空）"""
+        if not HAS_PYPINYIN:
+            return []
+        full = lazy_pinyin(name)
+        initials = lazy_pinyin(name, style=Style.FIRST_LETTER)
+        return [ItemIndex.normalize("".join(full)), ItemIndex.normalize("".join(initials))]
+
+    def _add_key(self, key: str, object_id: str):
+        if not key:
+            return
+        self._keys.setdefault(key, set()).add(object_id)
+        # 同时索引单字和二元组，单字查询也能命中
+        for gram in self._query_grams(key) | set(key):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def get(self, object_id) -> Optional[Dict]:
+        return self.items.get(str(object_id))
+
+    def search(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        按名称搜索物品
+        排序：完全匹配 > 前缀匹配 > 包含 > n-gram 模糊匹配，同级按名称长度
+        """
+        q = self.normalize(query)
+        if not q:
+            return []
+
+        q_grams = self._query_grams(q)
+        hits: Dict[str, int] = {}
+        for gram in q_grams:
+            for key in self._grams.get(gram, ()):
+                hits[key] = hits.get(key, 0) + 1
+
+        ranked: List[Tuple[float, int, str]] = []
+        for key, count in hits.items():
+            if key == q:
+                rank = 0.0
+            elif key.startswith(q):
+                rank = 1.0
+            elif q in key:
+                rank = 2.0
+            else:
+                overlap = count / len(q_grams)
+                if overlap < self.MIN_OVERLAP:
+                    continue
+                rank = 3.0 + (1 - overlap)
+            ranked.append((rank, len(key), key))
+        ranked.sort()
+
+        results: List[Dict] = []
+        seen: Set[str] = set()
+        for _, _, key in ranked:
+            for object_id in sorted(self._keys[key]):
+                if object_id not in seen:
+                    seen.add(object_id)
+                    results.append(self.items[object_id])
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+
+class ItemCatalog:
+    """本地物品目录：定期同步 + 内存索引，查询接口与 DeltaForceAPI.search_object 一致"""
+
+    SYNC_INTERVAL = 12 * 3600  # 同步间隔（秒）
+    RETRY_INTERVAL = 10 * 60  # 同步失败后的重试间隔（秒）
+    SEARCH_LIMIT = 50  # 本地名称搜索的最大返回数
+
+    def __init__(self, api: "DeltaForceAPI", db_manager: "DeltaForceSQLiteManager",
+                 aliases: Optional[Dict[str, str]] = None):
+        self.api = api
+        self.db_manager = db_manager
+        self.aliases = aliases or {}
+        self.index = ItemIndex([], self.aliases)
+        self.synced_at = 0  # 最近一次同步的时间戳（秒）
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return len(self.index) > 0
+
+    async def start(self):
+        """启动后台同步任务（先加载本地数据，过期时立即同步）"""
+        if not HAS_PYPINYIN:
+            logger.warning("[三角洲] 未安装 pypinyin，物品搜索不支持拼音全拼/首字母匹配，可执行 pip install pypinyin 启用")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def load(self):
+        """从本地数据库加载物品目录"""
+        items, updated_at = await self.db_manager.get_item_catalog()
+        if items:
+            self.index = ItemIndex(items, self.aliases)
+            self.synced_at = updated_at
+            logger.info(f"[三角洲] 已加载本地物品目录，共 {len(self.index)} 件")
+
+    async def sync(self) -> bool:
+        """从远程同步全量物品列表"""
+        with self.api.priority(PRIORITY_BACKGROUND):
+            result = await self.api.get_object_list()
+        is_success = isinstance(result, dict) and (result.get("success") is True or result.get("code") == 0)
+        data = result.get("data") if is_success else None
+        items = [item for item in (data or {}).get("keywords", []) if item.get("objectID")] \
+            if isinstance(data, dict) else []
+        if not items:
+            logger.warning(f"[三角洲] 物品目录同步失败: {result.get('msg') if isinstance(result, dict) else result}")
+            return False
+
+        self.index = ItemIndex(items, self.aliases)
+        self.synced_at = int(time.time())
+        await self.db_manager.replace_item_catalog(items)
+        logger.info(f"[三角洲] 物品目录同步完成，共 {len(self.index)} 件")
+        return True
+
+    async def _sync_loop(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.warning(f"[三角洲] 加载本地物品目录失败: {e}")
+        while True:
+            wait = self.SYNC_INTERVAL - (time.time() - self.synced_at)
+            if wait <= 0:
+                try:
+                    wait = self.SYNC_INTERVAL if await self.sync() else self.RETRY_INTERVAL
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"[三角洲] 物品目录同步异常: {e}")
+                    wait = self.RETRY_INTERVAL
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _result(items: List[Dict]) -> Dict:
+        return {"success": True, "code": 0, "data": {"keywords": items}}
+
+    async def search_object(self, keyword: str = "", object_ids: str = "") -> Dict:
+        """搜索物品：优先本地目录，未命中部分回退到远程搜索"""
+        if object_ids and not keyword:
+            ids = [i.strip() for i in object_ids.split(",") if i.strip()]
+            found = {i: self.index.get(i) for i in ids}
+            missing = [i for i, item in found.items() if item is None]
+            if not missing:
+                return self._result(list(found.values()))
+
+            result = await self.api.search_object(object_ids=",".join(missing))
+            local = [item for item in found.values() if item is not None]
+            if not (isinstance(result, dict) and (result.get("success") is True or result.get("code") == 0)):
+                return self._result(local) if local else result
+            remote = {str(item.get("objectID")): item for item in result.get("data", {}).get("keywords", [])}
+            merged = self._result([found[i] or remote[i] for i in ids if found[i] or i in remote])
+            if result.get("failed_ids"):
+                # 保留批量请求的部分失败信息，供调用方提示
+                merged.update(failed_ids=result["failed_ids"], msg=result.get("msg", ""))
+            return merged
+
+        if keyword:
+            items = self.index.search(keyword, self.SEARCH_LIMIT)
+            if items:
+                return self._result(items)
+        return await self.api.search_object(keyword=keyword, object_ids=object_ids)
+
+    def get_status(self) -> Dict:
+        return {
+            "items": len(self.index),
+            "synced_at": self.synced_at,
+            "pinyin": HAS_PYPINYIN
+        }
@@ -0,0 +1,105 @@
+"""
+本地价格历史
+按需从 get_price_history 增量同步物品价格到 SQLite，并维护每日最高/最低/均价汇总，
+历史、趋势和利润查询直接读取本地数据，可查询超过接口返回范围的时间窗口
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+from astrbot.api import logger
+
+if TYPE_CHECKING:
+    from .df_api import DeltaForceAPI
+    from .df_sqlite import DeltaForceSQLiteManager
+
+
+class PriceHistoryStore:
+    """物品价格历史的本地存储"""
+
+    REFRESH_INTERVAL = 10 * 60  # 距上次同步超过该时间（秒）才重新请求接口
+    MAX_DAYS = 365  # 可查询的最大天数
+
+    def __init__(self, api: "DeltaForceAPI", db_manager: "DeltaForceSQLiteManager"):
+        self.api = api
+        self.db_manager = db_manager
+
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[int]:
+        """解析 ISO 时间字符串或秒/毫秒时间戳"""
+        if value in (None, ""):
+            return None
+        try:
+            ts = float(value)
+            return int(ts / 1000 if ts > 32503680000 else ts)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+        except ValueError:
+            return None
+
+    async def refresh(self, object_id: str, force: bool = False) -> Tuple[bool, Optional[Dict]]:
+        """
+        从接口同步物品价格（距上次同步不足 REFRESH_INTERVAL 时跳过）
+
+        Returns:
+            (本地是否有可用数据, 同步失败时的接口响应，成功或跳过时为 None)
+        """
+        last_ts, synced_at = await self.db_manager.get_price_sync(object_id)
+        if not force and synced_at and time.time() - synced_at < self.REFRESH_INTERVAL:
+            return True, None
+
+        result = await self.api.get_price_history(object_id)
+        is_success = isinstance(result, dict) and (result.get("success") is True or result.get("code") == 0)
+        data = result.get("data") if is_success else None
+        if not isinstance(data, dict):
+            logger.warning(f"[三角洲] 同步物品 {object_id} 价格历史失败: "
+                           f"{result.get('msg') if isinstance(result, dict) else result}")
+            return last_ts > 0, result
+
+        points = []
+        for item in data.get("history", []):
+            ts = self._parse_timestamp(item.get("timestamp"))
+            price = item.get("avgPrice")
+            if ts is None or price is None:
+                continue
+            try:
+                points.append((ts, datetime.fromtimestamp(ts).strftime("%Y-%m-%d"), float(price)))
+            except (TypeError, ValueError):
+                continue
+        added = await self.db_manager.add_price_points(object_id, points)
+        if added > 0:
+            logger.debug(f"[三角洲] 物品 {object_id} 新增 {added} 个价格数据点")
+        return last_ts > 0 or added > 0, None
+
+    async def get_history(self, object_id: str, days: int = 7) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        获取物品最近 days 天的价格历史（必要时先增量同步）
+
+        Returns:
+            (历史数据, 同步失败时的接口响应)。历史数据为
+            {"daily": [每日汇总，按日期倒序], "stats": {latestPrice, avgPrice, maxPrice, minPrice, priceRange}}，
+            本地无数据时为 None
+        """
+        days = max(1, min(days, self.MAX_DAYS))
+        has_data, error = await self.refresh(object_id)
+        if not has_data:
+            return None, error
+
+        since_day = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        daily = await self.db_manager.get_price_daily(object_id, since_day)
+        if not daily:
+            return None, error
+
+        samples = sum(row["samples"] for row in daily)
+        max_price = max(row["max_price"] for row in daily)
+        min_price = min(row["min_price"] for row in daily)
+        stats = {
+            "latestPrice": await self.db_manager.get_latest_price(object_id),
+            "avgPrice": sum(row["avg_price"] * row["samples"] for row in daily) / samples if samples else None,
+            "maxPrice": max_price,
+            "minPrice": min_price,
+            "priceRange": max_price - min_price
+        }
+        return {"daily": daily, "stats": stats}, error
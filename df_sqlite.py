@@ -1,9 +1,29 @@
-import aiosqlite, os, json
+import aiosqlite, asyncio, os, json, time
+from contextlib import asynccontextmanager
 from pathlib import Path
 from astrbot.api import logger
-from typing import Dict, List, Any, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
 
 class DeltaForceSQLiteManager:
+    # 连接配置
+    CACHED_STATEMENTS = 256  # 预编译语句缓存数
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",  # 读写不互斥
+        "PRAGMA synchronous=NORMAL",  # WAL 模式下足够安全，减少 fsync
+        "PRAGMA cache_size=-8000",  # 页缓存 8MB
+        "PRAGMA mmap_size=67108864",  # 内存映射 64MB
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+    
+    # 写入合并配置
+    WRITE_WINDOW = 0.005  # 写操作收集窗口（秒）
+    WRITE_MAX_BATCH = 100  # 队列达到该数量时立即提交
+    
+    # 数据库整理配置
+    VACUUM_FREE_RATIO = 0.25  # 空闲页占比达到该值时才整理
+    VACUUM_MIN_FREE_PAGES = 256  # 空闲页少于该数量时不整理
+
     def __init__(self, db_path=None):
         if not db_path:
             # 使用推荐的数据存储路径
@@ -12,34 +32,183 @@ class DeltaForceSQLiteManager:
             self.db_path = self.data_dir / "users.db"
         else:
             self.db_path = Path(db_path)
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()  # 串行化共享连接上的事务，避免交错提交
+        self._write_queue: List[tuple] = []  # [(写操作, Future 或 None), ...]
+        self._write_handle: Optional[asyncio.TimerHandle] = None
+        self._write_tasks: Set[asyncio.Task] = set()
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        """获取长连接（首次使用时打开并设置 PRAGMA）"""
+        if self._conn is None:
+            conn = await aiosqlite.connect(self.db_path, cached_statements=self.CACHED_STATEMENTS)
+            for pragma in self.PRAGMAS:
+                await conn.execute(pragma)
+            self._conn = conn
+        return self._conn
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        """独占使用长连接，异常时回滚未提交的修改"""
+        async with self._lock:
+            conn = await self._get_conn()
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    await conn.rollback()
+                raise
+
+    async def _write(self, op: Callable[[aiosqlite.Connection], Awaitable[Any]], durable: bool = True) -> Any:
+        """
+        提交写操作到合并队列，同一窗口内的写操作在一个事务中提交
+        
+        Args:
+            op: 写操作，参数为数据库连接，无需 commit
+            durable: True 时等待事务提交后返回 op 的结果（失败抛出异常）；
+                     False 时入队后立即返回，失败只记录日志
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future() if durable else None
+        self._write_queue.append((op, future))
+        if len(self._write_queue) >= self.WRITE_MAX_BATCH:
+            if self._write_handle is not None:
+                self._write_handle.cancel()
+            self._start_write_flush()
+        elif self._write_handle is None:
+            self._write_handle = loop.call_later(self.WRITE_WINDOW, self._start_write_flush)
+        if future is not None:
+            return await future
+    
+    def _start_write_flush(self):
+        self._write_handle = None
+        task = asyncio.create_task(self.flush_writes())
+        self._write_tasks.add(task)
+        task.add_done_callback(self._write_tasks.discard)
+    
+    async def flush_writes(self):
+        """提交队列中所有待写操作（每个操作独立 SAVEPOINT，失败只回滚自身）"""
+        async with self._lock:
+            batch, self._write_queue = self._write_queue, []
+            if not batch:
+                return
+            
+            results: List[Any] = []
+            try:
+                conn = await self._get_conn()
+                await conn.execute("BEGIN")
+                for op, _ in batch:
+                    await conn.execute("SAVEPOINT write_op")
+                    try:
+                        results.append(await op(conn))
+                    except Exception as e:
+                        await conn.execute("ROLLBACK TO write_op")
+                        results.append(e)
+                    await conn.execute("RELEASE write_op")
+                await conn.commit()
+            except Exception as e:
+                if self._conn is not None and self._conn.in_transaction:
+                    await self._conn.rollback()
+                results = [e] * len(batch)
+            
+            for (_, future), result in zip(batch, results):
+                if future is None:
+                    if isinstance(result, Exception):
+                        logger.error(f"后台写入失败: {result}")
+                elif not future.done():
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+    
+    async def close(self):
+        """提交待写操作并关闭数据库连接"""
+        if self._write_handle is not None:
+            self._write_handle.cancel()
+            self._write_handle = None
+        await self.flush_writes()
+        async with self._lock:
+            if self._conn is not None:
+                await self._conn.close()
+                self._conn = None
+                logger.info("数据库连接已关闭")
 
     async def initialize_table(self):
         """初始化数据库表"""
         try:
-            async with aiosqlite.connect(self.db_path) as conn:
-                # 1. 用户数据表 (按照推荐 schema: user_id, data, updated_at)
-                # 使用 JSON blob 存储数据
+            async with self._connection() as conn:
+                # 1. 用户数据表 (selection/token 为独立列，其他字段以 JSON 存入 extra)
+                await self._migrate_users(conn)
                 await conn.execute('''
                 CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY,
-                    data TEXT,
-                    updated_at INTEGER
+                    user_id TEXT PRIMARY KEY NOT NULL,
+                    selection INTEGER NOT NULL DEFAULT 0,
+                    token TEXT,
+                    extra TEXT,
+                    updated_at INTEGER NOT NULL
                 )
                 ''')
                 
                 # 兼容旧代码，不建议使用，这里保留是为了避免重写 place_push_subscriptions 和 broadcast_history
                 # 如果完全迁移，应将这些表也迁移到 users 表的 data 字段中，但为了稳定性，暂且保留独立表
                 
-                # 特勤处推送订阅表
+                # 特勤处推送订阅表（推送目标拆分到 place_push_targets）
+                await self._migrate_place_push(conn)
                 await conn.execute('''
                 CREATE TABLE IF NOT EXISTS place_push_subscriptions (
                     user_id TEXT PRIMARY KEY NOT NULL,
                     token TEXT NOT NULL,
-                    push_targets TEXT NOT NULL,
                     created_at INTEGER NOT NULL,
                     updated_at INTEGER NOT NULL
                 )
                 ''')
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS place_push_targets (
+                    user_id TEXT NOT NULL,
+                    platform TEXT NOT NULL DEFAULT 'aiocqhttp',
+                    type TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    created_at INTEGER NOT NULL
+                )
+                ''')
+                await conn.execute(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_place_push_targets_user "
+                    "ON place_push_targets (user_id, type, id)"
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_place_push_targets_target "
+                    "ON place_push_targets (platform, type, id)"
+                )
+                
+                # 特勤处待推送任务与轮询状态（重启后恢复）
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS place_tasks (
+                    user_id TEXT NOT NULL,
+                    place_id TEXT NOT NULL,
+                    finish_time REAL NOT NULL,
+                    object_name TEXT NOT NULL,
+                    PRIMARY KEY (user_id, place_id)
+                ) WITHOUT ROWID
+                ''')
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS place_push_state (
+                    user_id TEXT PRIMARY KEY NOT NULL,
+                    polled_at INTEGER NOT NULL DEFAULT 0,
+                    expired_notified INTEGER NOT NULL DEFAULT 0
+                )
+                ''')
+                
+                # 日报/周报推送订阅表（每个用户每个推送群一行）
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS report_subscriptions (
+                    report_type TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    group_id TEXT NOT NULL,
+                    nickname TEXT,
+                    created_at INTEGER NOT NULL,
+                    PRIMARY KEY (report_type, user_id, group_id)
+                ) WITHOUT ROWID
+                ''')
                 
                 # 广播消息历史表
                 await conn.execute('''
@@ -53,6 +222,62 @@ class DeltaForceSQLiteManager:
                     created_at INTEGER NOT NULL
                 )
                 ''')
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_broadcast_history_created "
+                    "ON broadcast_history (created_at)"
+                )
+                # 广播逐目标投递记录（targets 列不再写入，仅保留兼容旧表结构）
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+                    broadcast_id INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    platform TEXT NOT NULL DEFAULT 'aiocqhttp',
+                    success INTEGER,
+                    error TEXT,
+                    PRIMARY KEY (broadcast_id, type, id)
+                ) WITHOUT ROWID
+                ''')
+                await self._migrate_broadcast_targets(conn)
+                
+                # 物品目录表（定期从 get_object_list 同步）
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS item_catalog (
+                    object_id TEXT PRIMARY KEY NOT NULL,
+                    name TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at INTEGER NOT NULL
+                )
+                ''')
+                
+                # 物品价格时间序列（增量写入）与每日汇总
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS price_history (
+                    object_id TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    price REAL NOT NULL,
+                    PRIMARY KEY (object_id, ts)
+                ) WITHOUT ROWID
+                ''')
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS price_daily (
+                    object_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    min_price REAL NOT NULL,
+                    max_price REAL NOT NULL,
+                    avg_price REAL NOT NULL,
+                    samples INTEGER NOT NULL,
+                    PRIMARY KEY (object_id, day)
+                ) WITHOUT ROWID
+                ''')
+                await conn.execute('''
+                CREATE TABLE IF NOT EXISTS price_sync (
+                    object_id TEXT PRIMARY KEY NOT NULL,
+                    last_ts INTEGER NOT NULL,
+                    synced_at INTEGER NOT NULL
+                )
+                ''')
                 
                 await conn.commit()
                 logger.info(f"数据库初始化成功: {self.db_path}")
@@ -61,52 +286,90 @@ class DeltaForceSQLiteManager:
             logger.error(f"数据库初始化失败: {e}")
             return False
     
+    @staticmethod
+    async def _legacy_source(conn: aiosqlite.Connection, table: str, legacy_column: str) -> Optional[str]:
+        """
+        查找需要迁移的旧表
+        返回: 仍为旧结构的 table，或上次迁移中断遗留的 {table}_legacy；无需迁移时为 None
+        """
+        cursor = await conn.execute(f"PRAGMA table_info({table})")
+        if legacy_column in {row[1] for row in await cursor.fetchall()}:
+            return table
+        cursor = await conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{table}_legacy",)
+        )
+        return f"{table}_legacy" if await cursor.fetchone() else None
+    
+    async def _migrate_users(self, conn: aiosqlite.Connection):
+        """将旧版 users 表 (user_id, data JSON, updated_at) 一次性迁移为独立列（单个事务，中断后可续做）"""
+        source = await self._legacy_source(conn, "users", "data")
+        if source is None:
+            return
+        
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = await conn.execute(f"SELECT user_id, data, updated_at FROM {source}")
+            rows = []
+            for user_id, data, updated_at in await cursor.fetchall():
+                try:
+                    data = json.loads(data) if data else {}
+                except (TypeError, ValueError):
+                    data = {}
+                if not isinstance(data, dict):
+                    data = {}
+                selection = data.pop("selection", 0)
+                token = data.pop("token", None)
+                rows.append((
+                    user_id, int(selection or 0), token or None,
+                    json.dumps(data, ensure_ascii=False) if data else None,
+                    updated_at or int(time.time())
+                ))
+            
+            if source == "users":
+                await conn.execute("ALTER TABLE users RENAME TO users_legacy")
+            await conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY NOT NULL,
+                selection INTEGER NOT NULL DEFAULT 0,
+                token TEXT,
+                extra TEXT,
+                updated_at INTEGER NOT NULL
+            )
+            ''')
+            # 续做时保留新表中已有（更新）的记录
+            await conn.executemany(
+                "INSERT OR IGNORE INTO users (user_id, selection, token, extra, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            await conn.execute("DROP TABLE users_legacy")
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+        logger.info(f"用户表迁移完成，共 {len(rows)} 条记录")
+    
     async def upsert_user(self, user: int, selection: int, token: str = None) -> bool:
         """
         异步插入或更新用户数据
-        使用新的 users 表结构存储
+        单条原子 upsert，未传入 token 时保留原有 token
         """
+        user_id = str(user)
+        current_time = int(time.time())
+        
+        async def write(conn: aiosqlite.Connection):
+            await conn.execute("""
+            INSERT INTO users (user_id, selection, token, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                selection=excluded.selection,
+                token=COALESCE(excluded.token, users.token),
+                updated_at=excluded.updated_at
+            """, (user_id, selection, token or None, current_time))
+        
         try:
-            user_id = str(user)
-            import time
-            current_time = int(time.time())
-            
-            # 读取旧数据（如果只是更新selection）
-            # 由于 upsert_user 参数没有包含所有可能的 data 字段，我们需要先读取
-            # 但这里我们主要存储 selection 和 token
-            
-            # 使用 upsert 语法
-            data_dict = {"selection": selection}
-            if token:
-                data_dict["token"] = token
-            
-            async with aiosqlite.connect(self.db_path) as conn:
-                # 先尝试读取现有数据，以合并而不是覆盖（如果未来有更多字段）
-                cursor = await conn.execute("SELECT data FROM users WHERE user_id=?", (user_id,))
-                row = await cursor.fetchone()
-                
-                existing_data = {}
-                if row and row[0]:
-                    try:
-                        existing_data = json.loads(row[0])
-                    except:
-                        pass
-                
-                # 合并数据
-                existing_data.update(data_dict)
-                final_json = json.dumps(existing_data)
-                
-                await conn.execute("""
-                INSERT INTO users (user_id, data, updated_at)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET
-                    data=excluded.data,
-                    updated_at=excluded.updated_at
-                """, (user_id, final_json, current_time))
-                
-                await conn.commit()
-                logger.info(f"用户 {user} 数据保存成功")
-                return True
+            await self._write(write)
+            logger.info(f"用户 {user} 数据保存成功")
+            return True
         except Exception as e:
             logger.error(f"数据库错误 (upsert_user): {e}")
             return False
@@ -114,47 +377,107 @@ class DeltaForceSQLiteManager:
     async def get_user(self, user: int) -> tuple:
         """
         异步查询用户数据
-        从 data JSON 中提取 selection 和 token
-        返回: (selection, token)
+        返回: (selection, token)，用户不存在时为 None
         """
         try:
             user_id = str(user)
-            async with aiosqlite.connect(self.db_path) as conn:
+            async with self._connection() as conn:
                 cursor = await conn.execute(
-                    "SELECT data FROM users WHERE user_id = ?",
+                    "SELECT selection, token FROM users WHERE user_id = ?",
                     (user_id,)
                 )
                 row = await cursor.fetchone()
-                
-                if row and row[0]:
-                    try:
-                        data = json.loads(row[0])
-                        selection = data.get("selection", 0)
-                        token = data.get("token")
-                        return (selection, token)
-                    except Exception as e:
-                        logger.error(f"解析用户数据失败: {e}")
-                        return None
-                return None
+                return (row[0], row[1]) if row else None
         except Exception as e:
             logger.error(f"查询错误: {e}")
             return None
 
     async def delete_user(self, user: int) -> bool:
         """删除用户数据"""
+        user_id = str(user)
+        
+        async def write(conn: aiosqlite.Connection):
+            await conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+        
         try:
-            user_id = str(user)
-            async with aiosqlite.connect(self.db_path) as conn:
-                await conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-                await conn.commit()
-                logger.info(f"用户 {user} 数据删除成功")
-                return True
+            await self._write(write)
+            logger.info(f"用户 {user} 数据删除成功")
+            return True
         except Exception as e:
             logger.error(f"删除错误: {e}")
             return False
 
     # ==================== 特勤处推送订阅 ====================
     
+    PLACE_PUSH_PAGE_SIZE = 500  # 分页遍历订阅时每页的用户数
+    
+    async def _migrate_place_push(self, conn: aiosqlite.Connection):
+        """
+        将旧版 place_push_subscriptions.push_targets (JSON 数组) 一次性迁移到 place_push_targets 表
+        （单个事务，中断后可续做）
+        """
+        source = await self._legacy_source(conn, "place_push_subscriptions", "push_targets")
+        if source is None:
+            return
+        
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = await conn.execute(
+                f"SELECT user_id, token, push_targets, created_at, updated_at FROM {source}"
+            )
+            subscriptions, targets = [], {}
+            for user_id, token, push_targets, created_at, updated_at in await cursor.fetchall():
+                subscriptions.append((user_id, token, created_at, updated_at))
+                try:
+                    push_targets = json.loads(push_targets) if push_targets else []
+                except (TypeError, ValueError):
+                    push_targets = []
+                for target in push_targets if isinstance(push_targets, list) else []:
+                    if isinstance(target, dict) and target.get("id"):
+                        key = (user_id, target.get("type", "group"), str(target["id"]))
+                        targets[key] = (user_id, target.get("platform", "aiocqhttp"), key[1], key[2], created_at)
+            
+            if source == "place_push_subscriptions":
+                await conn.execute("ALTER TABLE place_push_subscriptions RENAME TO place_push_subscriptions_legacy")
+            await conn.execute('''
+            CREATE TABLE IF NOT EXISTS place_push_subscriptions (
+                user_id TEXT PRIMARY KEY NOT NULL,
+                token TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+            ''')
+            await conn.execute('''
+            CREATE TABLE IF NOT EXISTS place_push_targets (
+                user_id TEXT NOT NULL,
+                platform TEXT NOT NULL DEFAULT 'aiocqhttp',
+                type TEXT NOT NULL,
+                id TEXT NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+            ''')
+            # 续做时去重依赖唯一索引，保留新表中已有的记录
+            await conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_place_push_targets_user "
+                "ON place_push_targets (user_id, type, id)"
+            )
+            await conn.executemany(
+                "INSERT OR IGNORE INTO place_push_subscriptions (user_id, token, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                subscriptions
+            )
+            await conn.executemany(
+                "INSERT OR IGNORE INTO place_push_targets (user_id, platform, type, id, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                list(targets.values())
+            )
+            await conn.execute("DROP TABLE place_push_subscriptions_legacy")
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+        logger.info(f"特勤处推送订阅迁移完成，共 {len(subscriptions)} 个用户、{len(targets)} 个推送目标")
+    
     async def add_place_push_subscription(
         self, 
         user_id: str, 
@@ -162,49 +485,28 @@ class DeltaForceSQLiteManager:
         push_target: Dict[str, str]
     ) -> bool:
         """添加或更新特勤处推送订阅"""
+        current_time = int(time.time())
+        
+        async def write(conn: aiosqlite.Connection):
+            await conn.execute(
+                """INSERT INTO place_push_subscriptions (user_id, token, created_at, updated_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET
+                       token=excluded.token,
+                       updated_at=excluded.updated_at""",
+                (user_id, token, current_time, current_time)
+            )
+            # 同一用户的同一目标只保留一条
+            await conn.execute(
+                """INSERT OR IGNORE INTO place_push_targets (user_id, platform, type, id, created_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (user_id, push_target.get("platform", "aiocqhttp"), push_target.get("type", "group"),
+                 str(push_target.get("id")), current_time)
+            )
+        
         try:
-            import time
-            current_time = int(time.time())
-            
-            async with aiosqlite.connect(self.db_path) as conn:
-                # 检查是否已存在
-                cursor = await conn.execute(
-                    "SELECT push_targets FROM place_push_subscriptions WHERE user_id = ?",
-                    (user_id,)
-                )
-                result = await cursor.fetchone()
-                
-                if result:
-                    # 更新现有订阅
-                    existing_targets = json.loads(result[0])
-                    
-                    # 检查目标是否已存在
-                    target_exists = any(
-                        t.get("type") == push_target.get("type") and 
-                        t.get("id") == push_target.get("id")
-                        for t in existing_targets
-                    )
-                    
-                    if not target_exists:
-                        existing_targets.append(push_target)
-                    
-                    await conn.execute(
-                        """UPDATE place_push_subscriptions 
-                           SET token = ?, push_targets = ?, updated_at = ?
-                           WHERE user_id = ?""",
-                        (token, json.dumps(existing_targets), current_time, user_id)
-                    )
-                else:
-                    # 创建新订阅
-                    await conn.execute(
-                        """INSERT INTO place_push_subscriptions 
-                           (user_id, token, push_targets, created_at, updated_at)
-                           VALUES (?, ?, ?, ?, ?)""",
-                        (user_id, token, json.dumps([push_target]), current_time, current_time)
-                    )
-                
-                await conn.commit()
-                return True
+            await self._write(write)
+            return True
         except Exception as e:
             logger.error(f"添加特勤处推送订阅失败: {e}")
             return False
@@ -216,131 +518,449 @@ class DeltaForceSQLiteManager:
         target_id: str = None
     ) -> bool:
         """移除特勤处推送订阅"""
+        async def write(conn: aiosqlite.Connection) -> bool:
+            if target_type and target_id:
+                # 移除特定目标，没有剩余目标时删除整条订阅
+                cursor = await conn.execute(
+                    "DELETE FROM place_push_targets WHERE user_id = ? AND type = ? AND id = ?",
+                    (user_id, target_type, str(target_id))
+                )
+                if cursor.rowcount == 0:
+                    return False
+                await conn.execute(
+                    """DELETE FROM place_push_subscriptions
+                       WHERE user_id = ?
+                         AND NOT EXISTS (SELECT 1 FROM place_push_targets WHERE user_id = ?)""",
+                    (user_id, user_id)
+                )
+            else:
+                # 移除所有订阅
+                await conn.execute("DELETE FROM place_push_targets WHERE user_id = ?", (user_id,))
+                await conn.execute("DELETE FROM place_push_subscriptions WHERE user_id = ?", (user_id,))
+            # 订阅已删除时一并清理待推送任务和轮询状态
+            for table in ("place_tasks", "place_push_state"):
+                await conn.execute(
+                    f"""DELETE FROM {table}
+                        WHERE user_id = ?
+                          AND NOT EXISTS (SELECT 1 FROM place_push_subscriptions WHERE user_id = ?)""",
+                    (user_id, user_id)
+                )
+            return True
+        
         try:
-            async with aiosqlite.connect(self.db_path) as conn:
-                if target_type and target_id:
-                    # 移除特定目标
-                    cursor = await conn.execute(
-                        "SELECT push_targets FROM place_push_subscriptions WHERE user_id = ?",
-                        (user_id,)
-                    )
-                    result = await cursor.fetchone()
-                    
-                    if not result:
-                        return False
-                    
-                    existing_targets = json.loads(result[0])
-                    updated_targets = [
-                        t for t in existing_targets 
-                        if not (t.get("type") == target_type and t.get("id") == target_id)
-                    ]
-                    
-                    if len(updated_targets) == 0:
-                        # 如果没有剩余目标，删除整条记录
-                        await conn.execute(
-                            "DELETE FROM place_push_subscriptions WHERE user_id = ?",
-                            (user_id,)
-                        )
-                    else:
-                        import time
-                        await conn.execute(
-                            """UPDATE place_push_subscriptions 
-                               SET push_targets = ?, updated_at = ?
-                               WHERE user_id = ?""",
-                            (json.dumps(updated_targets), int(time.time()), user_id)
-                        )
-                else:
-                    # 移除所有订阅
-                    await conn.execute(
-                        "DELETE FROM place_push_subscriptions WHERE user_id = ?",
-                        (user_id,)
-                    )
-                
-                await conn.commit()
-                return True
+            return await self._write(write)
         except Exception as e:
             logger.error(f"移除特勤处推送订阅失败: {e}")
             return False
     
-    async def get_place_push_subscriptions(self) -> List[Dict[str, Any]]:
-        """获取所有特勤处推送订阅"""
+    @staticmethod
+    async def _attach_place_push_targets(conn: aiosqlite.Connection, rows: List[tuple]) -> List[Dict[str, Any]]:
+        """为 (user_id, token) 行批量附加推送目标"""
+        if not rows:
+            return []
+        user_ids = [row[0] for row in rows]
+        placeholders = ",".join("?" * len(user_ids))
+        cursor = await conn.execute(
+            f"""SELECT user_id, platform, type, id FROM place_push_targets
+                WHERE user_id IN ({placeholders})
+                ORDER BY user_id, rowid""",
+            user_ids
+        )
+        targets: Dict[str, List[Dict[str, str]]] = {}
+        for user_id, platform, target_type, target_id in await cursor.fetchall():
+            targets.setdefault(user_id, []).append({"type": target_type, "id": target_id, "platform": platform})
+        return [
+            {"user_id": user_id, "token": token, "push_targets": targets.get(user_id, [])}
+            for user_id, token in rows
+        ]
+    
+    async def get_place_push_subscriptions_page(
+        self,
+        after_user_id: str = "",
+        limit: int = PLACE_PUSH_PAGE_SIZE
+    ) -> List[Dict[str, Any]]:
+        """
+        按 user_id 键集分页获取有推送目标的订阅
+        
+        Args:
+            after_user_id: 上一页最后一个 user_id，首页传空
+            limit: 每页数量
+        """
         try:
-            async with aiosqlite.connect(self.db_path) as conn:
+            async with self._connection() as conn:
                 cursor = await conn.execute(
-                    "SELECT user_id, token, push_targets FROM place_push_subscriptions"
+                    """SELECT s.user_id, s.token FROM place_push_subscriptions s
+                       WHERE s.user_id > ?
+                         AND EXISTS (SELECT 1 FROM place_push_targets t WHERE t.user_id = s.user_id)
+                       ORDER BY s.user_id
+                       LIMIT ?""",
+                    (after_user_id, limit)
                 )
-                results = await cursor.fetchall()
-                
-                return [
-                    {
-                        "user_id": row[0],
-                        "token": row[1],
-                        "push_targets": json.loads(row[2])
-                    }
-                    for row in results
-                ]
+                return await self._attach_place_push_targets(conn, await cursor.fetchall())
         except Exception as e:
             logger.error(f"获取特勤处推送订阅失败: {e}")
             return []
     
+    async def iter_place_push_subscriptions(
+        self,
+        page_size: int = PLACE_PUSH_PAGE_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐页流式遍历所有订阅，翻页之间不占用数据库连接"""
+        after_user_id = ""
+        while True:
+            page = await self.get_place_push_subscriptions_page(after_user_id, page_size)
+            for sub in page:
+                yield sub
+            if len(page) < page_size:
+                return
+            after_user_id = page[-1]["user_id"]
+    
+    async def get_place_push_subscriptions(self) -> List[Dict[str, Any]]:
+        """获取所有特勤处推送订阅（大量用户时请使用 iter_place_push_subscriptions）"""
+        return [sub async for sub in self.iter_place_push_subscriptions()]
+    
     async def get_user_place_push_subscription(self, user_id: str) -> Optional[Dict[str, Any]]:
         """获取用户的特勤处推送订阅"""
         try:
-            async with aiosqlite.connect(self.db_path) as conn:
+            async with self._connection() as conn:
                 cursor = await conn.execute(
-                    "SELECT user_id, token, push_targets FROM place_push_subscriptions WHERE user_id = ?",
+                    "SELECT user_id, token FROM place_push_subscriptions WHERE user_id = ?",
                     (user_id,)
                 )
-                result = await cursor.fetchone()
-                
-                if result:
-                    return {
-                        "user_id": result[0],
-                        "token": result[1],
-                        "push_targets": json.loads(result[2])
-                    }
-                return None
+                subscriptions = await self._attach_place_push_targets(conn, await cursor.fetchall())
+                return subscriptions[0] if subscriptions else None
         except Exception as e:
             logger.error(f"获取用户特勤处推送订阅失败: {e}")
             return None
 
+    async def replace_place_tasks(self, user_id: str, tasks: List[tuple], polled_at: int) -> bool:
+        """
+        用最新轮询结果替换用户的待推送任务并记录轮询时间（入队后立即返回）
+        
+        Args:
+            tasks: [(place_id, 完成时间戳, 物品名), ...]
+        """
+        async def write(conn: aiosqlite.Connection):
+            await conn.execute("DELETE FROM place_tasks WHERE user_id = ?", (user_id,))
+            await conn.executemany(
+                "INSERT INTO place_tasks (user_id, place_id, finish_time, object_name) VALUES (?, ?, ?, ?)",
+                [(user_id, str(place_id), finish_time, object_name) for place_id, finish_time, object_name in tasks]
+            )
+            await conn.execute(
+                """INSERT INTO place_push_state (user_id, polled_at) VALUES (?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET polled_at=excluded.polled_at""",
+                (user_id, polled_at)
+            )
+        
+        try:
+            await self._write(write, durable=False)
+            return True
+        except Exception as e:
+            logger.error(f"保存特勤处任务失败: {e}")
+            return False
+    
+    async def remove_place_task(self, user_id: str, place_id: str) -> bool:
+        """删除已推送的任务（入队后立即返回）"""
+        async def write(conn: aiosqlite.Connection):
+            await conn.execute(
+                "DELETE FROM place_tasks WHERE user_id = ? AND place_id = ?", (user_id, str(place_id))
+            )
+        
+        try:
+            await self._write(write, durable=False)
+            return True
+        except Exception as e:
+            logger.error(f"删除特勤处任务失败: {e}")
+            return False
+    
+    async def set_place_push_expired(self, user_id: str, notified: bool) -> bool:
+        """记录是否已发送登录过期通知（入队后立即返回）"""
+        async def write(conn: aiosqlite.Connection):
+            await conn.execute(
+                """INSERT INTO place_push_state (user_id, expired_notified) VALUES (?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET expired_notified=excluded.expired_notified""",
+                (user_id, int(notified))
+            )
+        
+        try:
+            await self._write(write, durable=False)
+            return True
+        except Exception as e:
+            logger.error(f"保存特勤处推送状态失败: {e}")
+            return False
+    
+    async def get_place_tasks(self) -> List[Dict[str, Any]]:
+        """获取所有待推送的特勤处任务"""
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT user_id, place_id, finish_time, object_name FROM place_tasks"
+                )
+                return [
+                    {
+                        "user_id": row[0],
+                        "place_id": row[1],
+                        "finish_time": row[2],
+                        "object_name": row[3]
+                    }
+                    for row in await cursor.fetchall()
+                ]
+        except Exception as e:
+            logger.error(f"获取特勤处任务失败: {e}")
+            return []
+    
+    async def get_place_push_states(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取所有用户的特勤处轮询状态
+        返回: {user_id: {"polled_at": 最近轮询时间戳, "expired_notified": 0/1}}
+        """
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT user_id, polled_at, expired_notified FROM place_push_state"
+                )
+                return {
+                    row[0]: {"polled_at": row[1], "expired_notified": row[2]}
+                    for row in await cursor.fetchall()
+                }
+        except Exception as e:
+            logger.error(f"获取特勤处推送状态失败: {e}")
+            return {}
+
+    # ==================== 日报/周报推送订阅 ====================
+    
+    REPORT_PAGE_SIZE = 500  # 分页遍历订阅时每页的用户数
+    
+    async def add_report_subscription(
+        self,
+        report_type: str,
+        user_id: str,
+        group_id: str,
+        nickname: str = ""
+    ) -> int:
+        """
+        添加日报/周报推送订阅
+        
+        Args:
+            report_type: 推送类型 (daily/weekly)
+        
+        Returns:
+            新增的订阅数（已订阅时为 0），失败返回 -1
+        """
+        async def write(conn: aiosqlite.Connection) -> int:
+            cursor = await conn.execute(
+                """INSERT OR IGNORE INTO report_subscriptions
+                   (report_type, user_id, group_id, nickname, created_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (report_type, str(user_id), str(group_id), nickname or None, int(time.time()))
+            )
+            added = cursor.rowcount
+            if nickname:
+                await conn.execute(
+                    "UPDATE report_subscriptions SET nickname = ? WHERE report_type = ? AND user_id = ?",
+                    (nickname, report_type, str(user_id))
+                )
+            return added
+        
+        try:
+            return await self._write(write)
+        except Exception as e:
+            logger.error(f"添加{report_type}推送订阅失败: {e}")
+            return -1
+    
+    async def remove_report_subscription(self, report_type: str, user_id: str, group_id: str) -> int:
+        """
+        移除日报/周报推送订阅
+        
+        Returns:
+            删除的订阅数（未订阅时为 0），失败返回 -1
+        """
+        async def write(conn: aiosqlite.Connection) -> int:
+            cursor = await conn.execute(
+                "DELETE FROM report_subscriptions WHERE report_type = ? AND user_id = ? AND group_id = ?",
+                (report_type, str(user_id), str(group_id))
+            )
+            return cursor.rowcount
+        
+        try:
+            return await self._write(write)
+        except Exception as e:
+            logger.error(f"移除{report_type}推送订阅失败: {e}")
+            return -1
+    
+    async def import_report_subscriptions(self, report_type: str, rows: List[tuple]) -> int:
+        """
+        批量导入订阅（用于从旧配置迁移）
+        
+        Args:
+            rows: [(user_id, group_id, nickname), ...]
+        
+        Returns:
+            新增的订阅数，失败返回 -1
+        """
+        try:
+            current_time = int(time.time())
+            async with self._connection() as conn:
+                before = conn.total_changes
+                await conn.executemany(
+                    """INSERT OR IGNORE INTO report_subscriptions
+                       (report_type, user_id, group_id, nickname, created_at)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    [(report_type, str(user_id), str(group_id), nickname or None, current_time)
+                     for user_id, group_id, nickname in rows]
+                )
+                added = conn.total_changes - before
+                await conn.commit()
+                return added
+        except Exception as e:
+            logger.error(f"导入{report_type}推送订阅失败: {e}")
+            return -1
+    
+    async def get_report_subscriptions_page(
+        self,
+        report_type: str,
+        after_user_id: str = "",
+        limit: int = REPORT_PAGE_SIZE
+    ) -> List[Dict[str, Any]]:
+        """
+        按 user_id 键集分页获取订阅用户
+        
+        Returns:
+            [{"user_id", "nickname", "groups": [群ID, ...]}, ...]
+        """
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    """SELECT user_id, group_id, nickname FROM report_subscriptions
+                       WHERE report_type = ? AND user_id IN (
+                           SELECT DISTINCT user_id FROM report_subscriptions
+                           WHERE report_type = ? AND user_id > ?
+                           ORDER BY user_id
+                           LIMIT ?
+                       )
+                       ORDER BY user_id, group_id""",
+                    (report_type, report_type, after_user_id, limit)
+                )
+                users: Dict[str, Dict[str, Any]] = {}
+                for user_id, group_id, nickname in await cursor.fetchall():
+                    user = users.setdefault(user_id, {"user_id": user_id, "nickname": None, "groups": []})
+                    user["groups"].append(group_id)
+                    user["nickname"] = user["nickname"] or nickname
+                return list(users.values())
+        except Exception as e:
+            logger.error(f"获取{report_type}推送订阅失败: {e}")
+            return []
+    
+    async def iter_report_subscriptions(
+        self,
+        report_type: str,
+        page_size: int = REPORT_PAGE_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐页流式遍历某类推送的订阅用户，翻页之间不占用数据库连接"""
+        after_user_id = ""
+        while True:
+            page = await self.get_report_subscriptions_page(report_type, after_user_id, page_size)
+            for sub in page:
+                yield sub
+            if len(page) < page_size:
+                return
+            after_user_id = page[-1]["user_id"]
+
     # ==================== 广播历史 ====================
     
+    async def _migrate_broadcast_targets(self, conn: aiosqlite.Connection):
+        """将旧版 broadcast_history.targets (JSON 数组) 迁移到 broadcast_deliveries（投递结果未知）"""
+        cursor = await conn.execute(
+            "SELECT id, targets FROM broadcast_history WHERE targets NOT IN ('', '[]')"
+        )
+        rows = await cursor.fetchall()
+        if not rows:
+            return
+        
+        deliveries = []
+        for broadcast_id, targets in rows:
+            try:
+                targets = json.loads(targets)
+            except (TypeError, ValueError):
+                targets = []
+            for target_id in dict.fromkeys(targets if isinstance(targets, list) else []):
+                deliveries.append((broadcast_id, "group", str(target_id), "aiocqhttp"))
+        await conn.executemany(
+            "INSERT OR IGNORE INTO broadcast_deliveries (broadcast_id, type, id, platform) VALUES (?, ?, ?, ?)",
+            deliveries
+        )
+        await conn.execute("UPDATE broadcast_history SET targets = '' WHERE targets NOT IN ('', '[]')")
+        logger.info(f"广播历史迁移完成，共 {len(rows)} 条广播、{len(deliveries)} 条投递记录")
+    
     async def save_broadcast_history(
         self, 
         sender_id: str, 
         message: str, 
-        targets: List[str],
+        targets: List[Dict[str, Any]],
         success_count: int = 0,
-        fail_count: int = 0
+        fail_count: int = 0,
+        durable: bool = True
     ) -> bool:
-        """保存广播历史"""
+        """
+        保存广播历史及逐目标投递结果
+        
+        Args:
+            targets: [{"type", "id", "platform", "success", "error"}, ...]
+            durable: False 时入队后立即返回，不等待提交
+        """
+        created_at = int(time.time())
+        
+        async def write(conn: aiosqlite.Connection):
+            cursor = await conn.execute(
+                """INSERT INTO broadcast_history 
+                   (sender_id, message, targets, success_count, fail_count, created_at)
+                   VALUES (?, ?, '', ?, ?, ?)""",
+                (sender_id, message, success_count, fail_count, created_at)
+            )
+            broadcast_id = cursor.lastrowid
+            await conn.executemany(
+                """INSERT OR REPLACE INTO broadcast_deliveries (broadcast_id, type, id, platform, success, error)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    (broadcast_id, t.get("type", "group"), str(t.get("id")), t.get("platform", "aiocqhttp"),
+                     None if t.get("success") is None else int(bool(t["success"])), t.get("error"))
+                    for t in targets if t.get("id")
+                ]
+            )
+        
         try:
-            import time
-            async with aiosqlite.connect(self.db_path) as conn:
-                await conn.execute(
-                    """INSERT INTO broadcast_history 
-                       (sender_id, message, targets, success_count, fail_count, created_at)
-                       VALUES (?, ?, ?, ?, ?, ?)""",
-                    (sender_id, message, json.dumps(targets), success_count, fail_count, int(time.time()))
-                )
-                await conn.commit()
-                return True
+            await self._write(write, durable)
+            return True
         except Exception as e:
             logger.error(f"保存广播历史失败: {e}")
             return False
     
-    async def get_broadcast_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """获取广播历史"""
+    async def get_broadcast_history(self, limit: int = 10, before_id: int = 0) -> List[Dict[str, Any]]:
+        """
+        获取广播历史（按 id 倒序的键集分页）
+        
+        Args:
+            before_id: 上一页最后一条的 id，首页传 0
+        """
         try:
-            async with aiosqlite.connect(self.db_path) as conn:
-                cursor = await conn.execute(
-                    """SELECT id, sender_id, message, targets, success_count, fail_count, created_at 
-                       FROM broadcast_history 
-                       ORDER BY created_at DESC 
-                       LIMIT ?""",
-                    (limit,)
-                )
+            async with self._connection() as conn:
+                if before_id > 0:
+                    cursor = await conn.execute(
+                        """SELECT id, sender_id, message, success_count, fail_count, created_at 
+                           FROM broadcast_history 
+                           WHERE id < ?
+                           ORDER BY id DESC 
+                           LIMIT ?""",
+                        (before_id, limit)
+                    )
+                else:
+                    cursor = await conn.execute(
+                        """SELECT id, sender_id, message, success_count, fail_count, created_at 
+                           FROM broadcast_history 
+                           ORDER BY id DESC 
+                           LIMIT ?""",
+                        (limit,)
+                    )
                 results = await cursor.fetchall()
                 
                 return [
@@ -348,13 +968,224 @@ class DeltaForceSQLiteManager:
                         "id": row[0],
                         "sender_id": row[1],
                         "message": row[2],
-                        "targets": json.loads(row[3]),
-                        "success_count": row[4],
-                        "fail_count": row[5],
-                        "created_at": row[6]
+                        "success_count": row[3],
+                        "fail_count": row[4],
+                        "created_at": row[5]
                     }
                     for row in results
                 ]
         except Exception as e:
             logger.error(f"获取广播历史失败: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    async def get_broadcast_deliveries(self, broadcast_id: int, failed_only: bool = False) -> List[Dict[str, Any]]:
+        """获取某次广播的逐目标投递记录（success 为 None 表示旧数据，结果未知）"""
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    f"""SELECT type, id, platform, success, error
+                        FROM broadcast_deliveries
+                        WHERE broadcast_id = ?{" AND success = 0" if failed_only else ""}
+                        ORDER BY type, id""",
+                    (broadcast_id,)
+                )
+                return [
+                    {
+                        "type": row[0],
+                        "id": row[1],
+                        "platform": row[2],
+                        "success": None if row[3] is None else bool(row[3]),
+                        "error": row[4]
+                    }
+                    for row in await cursor.fetchall()
+                ]
+        except Exception as e:
+            logger.error(f"获取广播投递记录失败: {e}")
+            return []
+    
+    async def prune_broadcast_history(self, before_ts: int) -> int:
+        """
+        删除指定时间之前的广播历史及其投递记录
+        
+        Returns:
+            删除的广播数，失败返回 -1
+        """
+        async def write(conn: aiosqlite.Connection) -> int:
+            await conn.execute(
+                """DELETE FROM broadcast_deliveries WHERE broadcast_id IN
+                   (SELECT id FROM broadcast_history WHERE created_at < ?)""",
+                (before_ts,)
+            )
+            cursor = await conn.execute("DELETE FROM broadcast_history WHERE created_at < ?", (before_ts,))
+            return cursor.rowcount
+        
+        try:
+            return await self._write(write)
+        except Exception as e:
+            logger.error(f"清理广播历史失败: {e}")
+            return -1
+    
+    async def vacuum(self) -> bool:
+        """提交待写操作后，空闲页足够多时整理数据库文件，回收已删除数据占用的空间"""
+        try:
+            await self.flush_writes()
+            async with self._connection() as conn:
+                async with conn.execute("PRAGMA freelist_count") as cursor:
+                    free_pages = (await cursor.fetchone())[0]
+                async with conn.execute("PRAGMA page_count") as cursor:
+                    total_pages = (await cursor.fetchone())[0]
+                if free_pages < self.VACUUM_MIN_FREE_PAGES or free_pages < total_pages * self.VACUUM_FREE_RATIO:
+                    return True
+                await conn.execute("VACUUM")
+                logger.info(f"整理数据库完成，回收 {free_pages}/{total_pages} 页")
+                return True
+        except Exception as e:
+            logger.error(f"整理数据库失败: {e}")
+            return False
+
+    # ==================== 物品目录 ====================
+    
+    async def replace_item_catalog(self, items: List[Dict[str, Any]]) -> bool:
+        """用最新同步的物品列表整体替换物品目录"""
+        try:
+            current_time = int(time.time())
+            rows = [
+                (str(item["objectID"]), item.get("objectName") or item.get("name") or "",
+                 json.dumps(item, ensure_ascii=False), current_time)
+                for item in items
+            ]
+            async with self._connection() as conn:
+                await conn.execute("DELETE FROM item_catalog")
+                await conn.executemany(
+                    "INSERT OR REPLACE INTO item_catalog (object_id, name, data, updated_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                await conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"保存物品目录失败: {e}")
+            return False
+    
+    async def get_item_catalog(self) -> tuple:
+        """
+        读取物品目录
+        返回: (物品列表, 同步时间戳)，无数据时为 ([], 0)
+        """
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute("SELECT data, updated_at FROM item_catalog")
+                rows = await cursor.fetchall()
+                if not rows:
+                    return [], 0
+                return [json.loads(row[0]) for row in rows], max(row[1] for row in rows)
+        except Exception as e:
+            logger.error(f"读取物品目录失败: {e}")
+            return [], 0
+
+    # ==================== 价格历史 ====================
+    
+    async def get_price_sync(self, object_id: str) -> tuple:
+        """
+        获取物品价格的同步状态
+        返回: (最新数据点时间戳, 最近同步时间戳)，从未同步时为 (0, 0)
+        """
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT last_ts, synced_at FROM price_sync WHERE object_id=?", (str(object_id),)
+                )
+                row = await cursor.fetchone()
+                return (row[0], row[1]) if row else (0, 0)
+        except Exception as e:
+            logger.error(f"获取价格同步状态失败: {e}")
+            return 0, 0
+    
+    async def add_price_points(self, object_id: str, points: List[tuple]) -> int:
+        """
+        增量写入价格数据点并重算受影响日期的每日汇总
+        
+        Args:
+            object_id: 物品ID
+            points: [(时间戳, 日期 YYYY-MM-DD, 价格), ...]
+        
+        Returns:
+            新写入的数据点数，失败返回 -1
+        """
+        try:
+            object_id = str(object_id)
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT last_ts FROM price_sync WHERE object_id=?", (object_id,)
+                )
+                row = await cursor.fetchone()
+                last_ts = row[0] if row else 0
+                new_points = [p for p in points if p[0] > last_ts]
+                
+                if new_points:
+                    await conn.executemany(
+                        "INSERT OR IGNORE INTO price_history (object_id, ts, day, price) VALUES (?, ?, ?, ?)",
+                        [(object_id, ts, day, price) for ts, day, price in new_points]
+                    )
+                    days = sorted({day for _, day, _ in new_points})
+                    placeholders = ",".join("?" * len(days))
+                    await conn.execute(f"""
+                    INSERT OR REPLACE INTO price_daily (object_id, day, min_price, max_price, avg_price, samples)
+                    SELECT object_id, day, MIN(price), MAX(price), AVG(price), COUNT(*)
+                    FROM price_history
+                    WHERE object_id=? AND day IN ({placeholders})
+                    GROUP BY object_id, day
+                    """, (object_id, *days))
+                    last_ts = max(last_ts, max(p[0] for p in new_points))
+                
+                await conn.execute("""
+                INSERT INTO price_sync (object_id, last_ts, synced_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(object_id) DO UPDATE SET
+                    last_ts=excluded.last_ts,
+                    synced_at=excluded.synced_at
+                """, (object_id, last_ts, int(time.time())))
+                await conn.commit()
+                return len(new_points)
+        except Exception as e:
+            logger.error(f"写入价格历史失败: {e}")
+            return -1
+    
+    async def get_price_daily(self, object_id: str, since_day: str) -> List[Dict[str, Any]]:
+        """获取指定日期（含）之后的每日价格汇总，按日期倒序"""
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    """SELECT day, min_price, max_price, avg_price, samples
+                       FROM price_daily
+                       WHERE object_id=? AND day>=?
+                       ORDER BY day DESC""",
+                    (str(object_id), since_day)
+                )
+                rows = await cursor.fetchall()
+                return [
+                    {
+                        "day": row[0],
+                        "min_price": row[1],
+                        "max_price": row[2],
+                        "avg_price": row[3],
+                        "samples": row[4]
+                    }
+                    for row in rows
+                ]
+        except Exception as e:
+            logger.error(f"获取每日价格汇总失败: {e}")
+            return []
+    
+    async def get_latest_price(self, object_id: str) -> Optional[float]:
+        """获取本地记录的最新价格"""
+        try:
+            async with self._connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT price FROM price_history WHERE object_id=? ORDER BY ts DESC LIMIT 1",
+                    (str(object_id),)
+                )
+                row = await cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logger.error(f"获取最新价格失败: {e}")
+            return None
\ No newline at end of file
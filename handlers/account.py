@@ -54,6 +54,7 @@ class AccountHandler(BaseHandler):
             selection=len(result_list.get("data", [])) + 1, 
             token=frameworkToken
         )
+        self.invalidate_active_token(event.get_sender_id())
         
         if not self.is_success(result_bind) or not result_db_bind:
             yield self.chain_reply(event, f"绑定账号失败，错误代码：{self.get_error_msg(result_bind)}")
@@ -104,6 +105,7 @@ class AccountHandler(BaseHandler):
             selection=len(result_list.get("data", [])) + 1, 
             token=frameworkToken
         )
+        self.invalidate_active_token(event.get_sender_id())
         
         if not self.is_success(result_bind) or not result_db_bind:
             yield self.chain_reply(event, f"绑定账号失败，错误代码：{self.get_error_msg(result_bind)}")
@@ -153,6 +155,7 @@ class AccountHandler(BaseHandler):
             selection=len(result_list.get("data", [])) + 1, 
             token=frameworkToken
         )
+        self.invalidate_active_token(event.get_sender_id())
         
         if not self.is_success(result_bind) or not result_db_bind:
             yield self.chain_reply(event, f"绑定账号失败，错误代码：{self.get_error_msg(result_bind)}")
@@ -200,6 +203,7 @@ class AccountHandler(BaseHandler):
             selection=len(result_list.get("data", [])) + 1, 
             token=frameworkToken
         )
+        self.invalidate_active_token(event.get_sender_id())
         
         if not self.is_success(result_bind) or not result_db_bind:
             yield self.chain_reply(event, f"绑定账号失败，错误代码：{self.get_error_msg(result_bind)}")
@@ -247,6 +251,7 @@ class AccountHandler(BaseHandler):
             selection=len(result_list.get("data", [])) + 1, 
             token=frameworkToken
         )
+        self.invalidate_active_token(event.get_sender_id())
         
         if not self.is_success(result_bind) or not result_db_bind:
             yield self.chain_reply(event, f"绑定账号失败，错误代码：{self.get_error_msg(result_bind)}")
@@ -382,6 +387,7 @@ class AccountHandler(BaseHandler):
         frameworkToken = accounts[value - 1].get("frameworkToken", "")
         result_unbind = await self.api.user_unbind(platformId=event.get_sender_id(), frameworkToken=frameworkToken)
         result_db_unbind = await self.db_manager.upsert_user(user=event.get_sender_id(), selection=value - 1, token=None)
+        self.invalidate_active_token(event.get_sender_id())
         
         if not self.is_success(result_unbind) or not result_db_unbind:
             yield self.chain_reply(event, f"解绑账号失败，错误代码：{self.get_error_msg(result_unbind)}")
@@ -418,6 +424,7 @@ class AccountHandler(BaseHandler):
             return
         
         result_db = await self.db_manager.upsert_user(user=event.get_sender_id(), selection=value - 1, token=None)
+        self.invalidate_active_token(event.get_sender_id())
         
         if not self.is_success(result_delete) or not result_db:
             yield self.chain_reply(event, f"删除账号失败，错误代码：{self.get_error_msg(result_delete)}")
@@ -443,6 +450,7 @@ class AccountHandler(BaseHandler):
         
         frameworkToken = accounts[value - 1].get("frameworkToken", "")
         result_db = await self.db_manager.upsert_user(user=event.get_sender_id(), selection=value, token=frameworkToken)
+        self.invalidate_active_token(event.get_sender_id())
         
         if not result_db:
             yield self.chain_reply(event, "切换账号失败")
@@ -473,6 +481,7 @@ class AccountHandler(BaseHandler):
                     selection=None,  # 保持当前选择
                     token=new_token
                 )
+                self.invalidate_active_token(event.get_sender_id())
                 yield self.chain_reply(event, "✅ QQ登录刷新成功！")
             else:
                 yield self.chain_reply(event, "✅ QQ登录状态正常，无需刷新")
@@ -503,6 +512,7 @@ class AccountHandler(BaseHandler):
                     selection=None,
                     token=new_token
                 )
+                self.invalidate_active_token(event.get_sender_id())
                 yield self.chain_reply(event, "✅ 微信登录刷新成功！")
             else:
                 yield self.chain_reply(event, "✅ 微信登录状态正常，无需刷新")
@@ -556,6 +566,7 @@ class AccountHandler(BaseHandler):
                 selection=len(result_list.get("data", [])) + 1,
                 token=framework_token
             )
+            self.invalidate_active_token(event.get_sender_id())
             
             if self.is_success(result_bind) and result_db:
                 yield self.chain_reply(event, "✅ QQ OAuth授权登录成功！")
@@ -609,6 +620,7 @@ class AccountHandler(BaseHandler):
                 selection=len(result_list.get("data", [])) + 1,
                 token=framework_token
             )
+            self.invalidate_active_token(event.get_sender_id())
             
             if self.is_success(result_bind) and result_db:
                 yield self.chain_reply(event, "✅ 微信OAuth授权登录成功！")
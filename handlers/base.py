@@ -4,18 +4,64 @@
 from astrbot.api.event import AstrMessageEvent
 from astrbot.api import logger
 import astrbot.api.message_components as Comp
+import asyncio
+import time
 import urllib.parse
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, List, Tuple, Callable, Awaitable
 from ..utils.render import Render
 
 
+class ActiveTokenCache:
+    """
+    用户账号列表与当前选择的进程内缓存（所有处理器共享）
+    账号绑定/解绑/切换/刷新或接口返回 token 过期时失效
+    """
+    
+    TTL = 60  # 缓存有效期（秒）
+    
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, List[Dict], int]] = {}
+    
+    def get(self, user_id) -> Optional[Tuple[List[Dict], int]]:
+        """获取未过期的 (账号列表, 当前选择序号)"""
+        entry = self._entries.get(str(user_id))
+        if entry is None:
+            return None
+        expires_at, accounts, selection = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(str(user_id), None)
+            return None
+        return accounts, selection
+    
+    def set(self, user_id, accounts: List[Dict], selection: int):
+        self._entries[str(user_id)] = (time.monotonic() + self.TTL, accounts, selection)
+    
+    def invalidate(self, user_id):
+        """清除指定用户的缓存"""
+        self._entries.pop(str(user_id), None)
+    
+    def invalidate_token(self, framework_token: str):
+        """清除账号列表中包含该 token 的所有用户缓存"""
+        for user_id, (_, accounts, _) in list(self._entries.items()):
+            if any(account.get("frameworkToken") == framework_token for account in accounts):
+                self._entries.pop(user_id, None)
+
+
 class BaseHandler:
     """基础处理器，提供通用方法"""
     
-    def __init__(self, api, db_manager):
+    # 所有处理器共享同一份激活 token 缓存
+    token_cache = ActiveTokenCache()
+    
+    FANOUT_CONCURRENCY = 4  # 并发扇出的最大并发数
+    FANOUT_TIMEOUT = 15  # 扇出中单个调用的超时（秒）
+    
+    def __init__(self, api, db_manager, catalog=None):
         self.api = api
         self.db_manager = db_manager
+        self.catalog = catalog  # 本地物品目录（可选）
         self.logger = logger
+        self.api.add_token_expired_listener(self.token_cache.invalidate_token)
     
     def is_success(self, response) -> bool:
         """判断接口请求是否成功
@@ -66,25 +112,84 @@ class BaseHandler:
             chain.extend(components)
         return event.chain_result(chain)
 
-    async def get_active_token(self, event: AstrMessageEvent):
-        """获取当前用户激活的 token"""
-        result_list = await self.api.user_acc_list(platformId=event.get_sender_id())
-        if not self.is_success(result_list):
-            return None, f"获取账号列表失败：{self.get_error_msg(result_list)}"
+    async def fan_out(self, calls: Dict[str, Callable[[], Awaitable[Any]]],
+                      limit: int = 0, timeout: float = 0) -> Dict[str, Any]:
+        """
+        有界并发执行多个相互独立的 API 调用，单个调用超时或出错不影响其他调用
+        
+        Args:
+            calls: {键: 无参的协程函数}
+            limit: 最大并发数，默认 FANOUT_CONCURRENCY
+            timeout: 单个调用的超时（秒），默认 FANOUT_TIMEOUT
+        
+        Returns:
+            {键: 结果}，失败的调用结果为 {"code": -1, "msg": 错误信息, "data": None}
+        """
+        semaphore = asyncio.Semaphore(limit or self.FANOUT_CONCURRENCY)
+        timeout = timeout or self.FANOUT_TIMEOUT
         
-        accounts = result_list.get("data", [])
-        if not accounts:
-            return None, "您尚未绑定任何账号，请先使用登录命令绑定账号"
+        async def run(key: str, call: Callable[[], Awaitable[Any]]):
+            async with semaphore:
+                try:
+                    # 截止时间同时限制 API 层的重试和地址切换
+                    with self.api.deadline(timeout):
+                        return key, await asyncio.wait_for(call(), timeout)
+                except asyncio.TimeoutError:
+                    return key, {"code": -1, "msg": f"请求超时 ({timeout}s)", "data": None}
+                except Exception as e:
+                    self.logger.warning(f"[三角洲] 并发请求 {key} 失败: {e}")
+                    return key, {"code": -1, "msg": str(e), "data": None}
         
-        user_data = await self.db_manager.get_user(event.get_sender_id())
-        if not user_data:
-            return None, "您尚未选择激活账号，请先使用 /三角洲 账号切换 命令选择账号"
+        return dict(await asyncio.gather(*(run(key, call) for key, call in calls.items())))
+
+    async def lookup_object(self, keyword: str = "", object_ids: str = ""):
+        """物品查询：优先使用本地物品目录，未命中时回退到远程搜索"""
+        if self.catalog is not None:
+            return await self.catalog.search_object(keyword=keyword, object_ids=object_ids)
+        return await self.api.search_object(keyword=keyword, object_ids=object_ids)
+
+    def invalidate_active_token(self, user_id):
+        """账号变更后清除该用户的激活 token 缓存"""
+        self.token_cache.invalidate(user_id)
+
+    async def _get_current_account(self, event: AstrMessageEvent):
+        """
+        获取当前用户选择的账号（账号列表和选择序号短时间内缓存）
+        
+        Returns:
+            (account, error_msg)
+        """
+        user_id = event.get_sender_id()
+        cached = self.token_cache.get(user_id)
+        if cached is not None:
+            accounts, current_selection = cached
+        else:
+            result_list = await self.api.user_acc_list(platformId=user_id)
+            if not self.is_success(result_list):
+                return None, f"获取账号列表失败：{self.get_error_msg(result_list)}"
+            
+            accounts = result_list.get("data", [])
+            if not accounts:
+                return None, "您尚未绑定任何账号，请先使用登录命令绑定账号"
+            
+            user_data = await self.db_manager.get_user(user_id)
+            if not user_data:
+                return None, "您尚未选择激活账号，请先使用 /三角洲 账号切换 命令选择账号"
+            
+            current_selection, _ = user_data
+            self.token_cache.set(user_id, accounts, current_selection)
         
-        current_selection, _ = user_data
         if current_selection < 1 or current_selection > len(accounts):
             return None, "当前选择的账号序号无效，请重新选择账号"
         
-        current_account = accounts[current_selection - 1]
+        return accounts[current_selection - 1], None
+
+    async def get_active_token(self, event: AstrMessageEvent):
+        """获取当前用户激活的 token"""
+        current_account, error = await self._get_current_account(event)
+        if error:
+            return None, error
+        
         if not current_account.get("isValid", False):
             return None, "当前账号已失效，请重新登录"
         
@@ -96,23 +201,10 @@ class BaseHandler:
 
     async def get_qqsafe_token(self, event: AstrMessageEvent):
         """获取QQ安全中心账号的 token"""
-        result_list = await self.api.user_acc_list(platformId=event.get_sender_id())
-        if not self.is_success(result_list):
-            return None, f"获取账号列表失败：{self.get_error_msg(result_list)}"
-        
-        accounts = result_list.get("data", [])
-        if not accounts:
-            return None, "您尚未绑定任何账号，请先使用登录命令绑定账号"
-        
-        user_data = await self.db_manager.get_user(event.get_sender_id())
-        if not user_data:
-            return None, "您尚未选择激活账号，请先使用 /三角洲 账号切换 命令选择账号"
-        
-        current_selection, _ = user_data
-        if current_selection < 1 or current_selection > len(accounts):
-            return None, "当前选择的账号序号无效，请重新选择账号"
+        current_account, error = await self._get_current_account(event)
+        if error:
+            return None, error
         
-        current_account = accounts[current_selection - 1]
         if current_account.get("tokenType", "").lower() != "qqsafe":
             return None, "当前激活账号不是QQ安全中心账号\n请先使用 /三角洲 账号切换 命令切换到QQ安全中心账号"
         
@@ -94,7 +94,7 @@ class DataHandler(BaseHandler):
             # 去重
             ids = list(set(str(i) for i in ids))
             # 批量查询
-            res = await self.api.search_object(object_ids=",".join(ids))
+            res = await self.lookup_object(object_ids=",".join(ids))
             name_map = {}
             if self.is_success(res):
                 keywords = res.get("data", {}).get("keywords", [])
@@ -450,7 +450,7 @@ class DataHandler(BaseHandler):
         type_names = {1: "设备", 2: "道具", 3: "货币"}
         yield self.chain_reply(event, f"正在查询{type_names[flow_type]}流水记录，请稍候...")
 
-        result = await self.api.get_flows(frameworkToken=token, flow_type=flow_type, page=page)
+        result = await self.api.get_flows(frameworkToken=token, flow_type=flow_type, page=page, prefetch=True)
         if not self.is_success(result):
             yield self.chain_reply(event, f"获取流水记录失败：{self.get_error_msg(result)}")
             return
@@ -654,7 +654,7 @@ class DataHandler(BaseHandler):
         mode_names = {4: "烽火地带", 5: "全面战场"}
         yield self.chain_reply(event, f"正在查询{mode_names[mode_type]}战绩记录，请稍候...")
 
-        result = await self.api.get_record(frameworkToken=token, mode_type=mode_type, page=page)
+        result = await self.api.get_record(frameworkToken=token, mode_type=mode_type, page=page, prefetch=True)
         if not self.is_success(result):
             yield self.chain_reply(event, f"获取战绩记录失败：{self.get_error_msg(result)}")
             return
@@ -27,6 +27,8 @@ HELP_LIST = {
                 {"icon": 92, "title": "/三角洲更新日志", "desc": "查看更新日志"},
                 {"icon": 92, "title": "/三角洲服务器状态", "desc": "服务器状态"},
                 {"icon": 92, "title": "/三角洲插件状态", "desc": "查看插件状态"},
+                {"icon": 92, "title": "/三角洲清除缓存", "desc": "清空API响应缓存"},
+                {"icon": 85, "title": "/三角洲API统计 [排序]", "desc": "查看各接口调用统计"},
             ]
         }
     ],
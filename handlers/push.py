@@ -97,10 +97,9 @@ class PushHandler(BaseHandler):
         group_id = self._get_group_id(event)
         nickname = self._get_nickname(event)
         
-        success, msg = self.daily_report.toggle_user_push(platform_id, group_id, enable, nickname)
+        success, msg = await self.daily_report.toggle_user_push(platform_id, group_id, enable, nickname)
         
         if success:
-            self._save_config()
             if self.scheduler and enable:
                 self.scheduler.add_job(
                     self.daily_report.JOB_ID,
@@ -130,10 +129,9 @@ class PushHandler(BaseHandler):
         group_id = self._get_group_id(event)
         nickname = self._get_nickname(event)
         
-        success, msg = self.weekly_report.toggle_user_push(platform_id, group_id, enable, nickname)
+        success, msg = await self.weekly_report.toggle_user_push(platform_id, group_id, enable, nickname)
         
         if success:
-            self._save_config()
             if self.scheduler and enable:
                 self.scheduler.add_job(
                     self.weekly_report.JOB_ID,
@@ -385,8 +385,67 @@ class SystemHandler(BaseHandler):
         # 数据库状态
         lines.append("  • 数据库: ✅ 正常")
         
+        # 后端地址排名
+        api_status = self.api.get_api_status()
+        lines.append("")
+        lines.append(f"🌐 后端地址 (模式: {api_status.get('mode', 'auto')}):")
+        for i, mirror in enumerate(api_status.get("ranking", []), 1):
+            latency = f"{mirror['latency_ms']}ms" if mirror.get("latency_ms") is not None else "未知"
+            state = "❌ 冷却中" if mirror.get("failed") else "✅"
+            lines.append(f"  {i}. {mirror['name']} {state} 延迟 {latency} | 错误率 {mirror['error_rate'] * 100:.0f}%")
+        breakers = api_status.get("breakers", [])
+        if breakers:
+            lines.append("  ⚡ 熔断中:")
+            for breaker in breakers:
+                lines.append(f"    • {breaker['url']} {breaker['family']} ({breaker['state']})")
+        
         lines.append("")
         lines.append(f"📊 运行信息:")
         lines.append(f"  • 客户端ID: {self.api.clientid[:8]}..." if self.api.clientid else "  • 客户端ID: 未配置")
         
         yield self.chain_reply(event, "\n".join(lines))
+
+    async def clear_api_cache(self, event: AstrMessageEvent):
+        """清空API响应缓存（管理员）"""
+        status = self.api.cache.get_status()
+        count = self.api.clear_cache()
+        
+        lines = [
+            "🧹【API缓存已清空】",
+            f"清除条目: {count}",
+            f"累计命中: {status['hits']} | 过期命中: {status['stale_hits']} | 未命中: {status['misses']}"
+        ]
+        yield self.chain_reply(event, "\n".join(lines))
+
+    async def get_api_metrics(self, event: AstrMessageEvent, sort_by: str = ""):
+        """查看各接口调用统计（管理员）"""
+        sort_fields = {"调用": "calls", "错误": "errors", "延迟": "p95_ms", "流量": "bytes_received"}
+        if sort_by not in sort_fields:
+            sort_by = "调用"
+        sort_key = sort_fields[sort_by]
+        rows = self.api.metrics.get_summary(sort_by=sort_key, limit=15)
+        if not rows:
+            yield self.chain_reply(event, "暂无API调用统计")
+            return
+        
+        total_calls = sum(row["calls"] for row in self.api.metrics.get_summary())
+        lines = [
+            f"📈【API调用统计】(按{sort_by}排序，前{len(rows)}项)",
+            f"总调用: {total_calls}",
+            ""
+        ]
+        for row in rows:
+            avg = f"{row['avg_ms']}ms" if row["avg_ms"] is not None else "-"
+            p95 = f"{row['p95_ms']}ms" if row["p95_ms"] is not None else ">30s"
+            error_rate = row["errors"] / row["calls"] * 100 if row["calls"] else 0
+            lines.append(f"• {row['url']}")
+            detail = (f"  调用 {row['calls']} | 错误 {error_rate:.0f}% | 均值 {avg} | p95 {p95}"
+                      f" | 重试 {row['retries']} | 切换 {row['failovers']} | {row['bytes_received'] / 1024:.0f}KB")
+            if row["cache_hit_ratio"] is not None:
+                detail += f" | 缓存命中 {row['cache_hit_ratio'] * 100:.0f}%"
+            if row["inflight"]:
+                detail += f" | 进行中 {row['inflight']}"
+            lines.append(detail)
+        lines.append("")
+        lines.append("排序可选: 调用 / 错误 / 延迟 / 流量")
+        yield self.chain_reply(event, "\n".join(lines))
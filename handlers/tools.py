@@ -2,17 +2,34 @@
 工具处理器
 包含：价格查询、物品搜索、利润排行等
 """
+import asyncio
 import re
 from typing import List, Dict, Tuple
 from astrbot.api.event import AstrMessageEvent
 import astrbot.api.message_components as Comp
 from .base import BaseHandler
+from ..df_price import PriceHistoryStore
 from ..utils.render import Render
 
 
 class ToolsHandler(BaseHandler):
     """工具处理器"""
 
+    DEFAULT_HISTORY_DAYS = 7  # 价格历史默认天数
+
+    def __init__(self, api, db_manager, catalog=None):
+        super().__init__(api, db_manager, catalog)
+        # 本地价格历史（增量同步 + 每日汇总）
+        self.price_store = PriceHistoryStore(api, db_manager)
+
+    @staticmethod
+    def _split_history_days(query: str, default: int) -> Tuple[str, int]:
+        """拆分查询末尾的天数参数，如 "AK47 30天" -> ("AK47", 30)"""
+        match = re.search(r"\s+(\d+)天$", query)
+        if match:
+            return query[:match.start()].strip(), int(match.group(1))
+        return query, default
+
     async def parse_item_query(self, query: str, max_results: int = 5) -> Tuple[List[str], List[Dict]]:
         """
         通用方法：将物品名称或ID查询转换为物品ID列表和物品信息列表
@@ -32,38 +49,34 @@ class ToolsHandler(BaseHandler):
         queries = [q.strip() for q in re.split(r'[,，]', query) if q.strip()]
         
         if len(queries) > 1:
-            # 多个查询项：分别处理每个查询
-            for single_query in queries:
+            # 多个查询项：并发处理每个查询，ID查询会在 API 层合并为批量请求
+            async def resolve(single_query: str) -> Tuple[List[str], List[Dict]]:
                 if single_query.isdigit():
                     # 纯数字，当作ID处理
-                    object_ids.append(single_query)
-                    search_res = await self.api.search_object(object_ids=single_query)
-                    if self.is_success(search_res):
-                        keywords = search_res.get("data", {}).get("keywords", [])
-                        if keywords:
-                            items_info.extend(keywords)
-                        else:
-                            items_info.append({
-                                "objectID": single_query,
-                                "objectName": f"物品ID: {single_query}"
-                            })
-                    else:
-                        items_info.append({
-                            "objectID": single_query,
-                            "objectName": f"物品ID: {single_query}"
-                        })
-                else:
-                    # 名称查询
-                    search_res = await self.api.search_object(keyword=single_query)
+                    search_res = await self.lookup_object(object_ids=single_query)
                     if self.is_success(search_res):
                         keywords = search_res.get("data", {}).get("keywords", [])
                         if keywords:
-                            # 对于名称查询，只取第一个最匹配的结果
-                            first_match = keywords[0]
-                            raw_id = first_match.get("objectID")
-                            if raw_id is not None and raw_id != 0 and raw_id != "":
-                                object_ids.append(str(raw_id))
-                                items_info.append(first_match)
+                            return [single_query], keywords
+                    return [single_query], [{
+                        "objectID": single_query,
+                        "objectName": f"物品ID: {single_query}"
+                    }]
+                # 名称查询
+                search_res = await self.lookup_object(keyword=single_query)
+                if self.is_success(search_res):
+                    keywords = search_res.get("data", {}).get("keywords", [])
+                    if keywords:
+                        # 对于名称查询，只取第一个最匹配的结果
+                        first_match = keywords[0]
+                        raw_id = first_match.get("objectID")
+                        if raw_id is not None and raw_id != 0 and raw_id != "":
+                            return [str(raw_id)], [first_match]
+                return [], []
+            
+            for ids, infos in await asyncio.gather(*(resolve(q) for q in queries)):
+                object_ids.extend(ids)
+                items_info.extend(infos)
         else:
             # 单个查询项
             single_query = queries[0] if queries else ""
@@ -71,7 +84,7 @@ class ToolsHandler(BaseHandler):
             if single_query.isdigit():
                 # 纯数字ID
                 object_ids = [single_query]
-                search_res = await self.api.search_object(object_ids=single_query)
+                search_res = await self.lookup_object(object_ids=single_query)
                 if self.is_success(search_res):
                     keywords = search_res.get("data", {}).get("keywords", [])
                     if keywords:
@@ -88,7 +101,7 @@ class ToolsHandler(BaseHandler):
                     }]
             else:
                 # 名称模糊搜索
-                search_res = await self.api.search_object(keyword=single_query)
+                search_res = await self.lookup_object(keyword=single_query)
                 if self.is_success(search_res):
                     keywords = search_res.get("data", {}).get("keywords", [])
                     if keywords:
@@ -147,7 +160,7 @@ class ToolsHandler(BaseHandler):
             return
 
         keyword = keyword.strip()
-        result = await self.api.search_object(keyword=keyword)
+        result = await self.lookup_object(keyword=keyword)
         
         if not self.is_success(result):
             yield self.chain_reply(event, f"搜索失败：{self.get_error_msg(result)}")
@@ -180,6 +193,9 @@ class ToolsHandler(BaseHandler):
         if len(items) > 15:
             output_lines.append(f"\n... 共 {len(items)} 个结果，仅显示前15个")
 
+        if result.get("failed_ids"):
+            output_lines.append(f"\n⚠️ 部分物品查询失败：{self.get_error_msg(result)}")
+
         output_lines.append("")
         output_lines.append("💡 使用 /三角洲 价格 <名称> 查询价格")
 
@@ -254,15 +270,18 @@ class ToolsHandler(BaseHandler):
             else:
                  output_lines.append("未找到有效价格数据")
 
+        if result.get("failed_ids"):
+            output_lines.append(f"\n⚠️ 部分物品价格查询失败：{self.get_error_msg(result)}")
+
         yield self.chain_reply(event, "\n".join(output_lines))
 
     async def get_price_history(self, event: AstrMessageEvent, query: str):
         """价格历史查询"""
         if not query or not query.strip():
-            yield self.chain_reply(event, "请输入要查询的物品名称或ID\n示例: /三角洲 价格历史 AK47")
+            yield self.chain_reply(event, "请输入要查询的物品名称或ID\n示例: /三角洲 价格历史 AK47 [30天]")
             return
 
-        query = query.strip()
+        query, days = self._split_history_days(query.strip(), self.DEFAULT_HISTORY_DAYS)
         yield self.chain_reply(event, "正在查询历史价格，请稍候...")
 
         # 使用通用方法解析查询（只取第一个结果）
@@ -275,27 +294,22 @@ class ToolsHandler(BaseHandler):
         object_id = object_ids[0]
         object_name = items_info[0].get("name", items_info[0].get("objectName", query)) if items_info else query
 
-        # 查询历史价格
-        result = await self.api.get_price_history(object_id)
-
-        if not self.is_success(result):
-            yield self.chain_reply(event, f"查询失败：{self.get_error_msg(result)}")
-            return
-
-        data = result.get("data", {})
-        history = data.get("history", [])
-        stats = data.get("stats", {})
-
+        # 查询历史价格（本地增量同步）
+        history, error = await self.price_store.get_history(object_id, days)
         if not history:
-            yield self.chain_reply(event, f"「{object_name}」暂无历史价格数据")
+            if error is not None:
+                yield self.chain_reply(event, f"查询失败：{self.get_error_msg(error)}")
+            else:
+                yield self.chain_reply(event, f"「{object_name}」暂无历史价格数据")
             return
 
+        stats = history["stats"]
         output_lines = [f"📈【{object_name} 价格历史】"]
         output_lines.append("━━━━━━━━━━━━━━━")
 
         # 统计信息
         if stats:
-            output_lines.append("📊 统计数据 (7天):")
+            output_lines.append(f"📊 统计数据 ({days}天):")
             output_lines.append(f"  当前价格: {self.format_price(stats.get('latestPrice', '-'))}")
             output_lines.append(f"  平均价格: {self.format_price(stats.get('avgPrice', '-'))}")
             output_lines.append(f"  最高价格: {self.format_price(stats.get('maxPrice', '-'))}")
@@ -303,40 +317,25 @@ class ToolsHandler(BaseHandler):
             output_lines.append(f"  价格波动: {self.format_price(stats.get('priceRange', '-'))}")
             output_lines.append("")
 
-        # 按天分组显示
-        from datetime import datetime
-        from collections import defaultdict
-
-        daily_data = defaultdict(list)
-        for item in history:
-            try:
-                ts = item.get("timestamp", "")
-                if ts:
-                    dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-                    date_key = dt.strftime("%m-%d")
-                    daily_data[date_key].append(float(item.get("avgPrice", 0)))
-            except:
-                continue
-
-        if daily_data:
-            output_lines.append("📅 每日价格:")
-            for date_key in sorted(daily_data.keys(), reverse=True)[:7]:
-                prices = daily_data[date_key]
-                if prices:
-                    avg = sum(prices) / len(prices)
-                    high = max(prices)
-                    low = min(prices)
-                    output_lines.append(f"  {date_key}: 均{self.format_price(avg)} (高{self.format_price(high)}/低{self.format_price(low)})")
+        # 每日汇总（最多显示最近7天）
+        output_lines.append("📅 每日价格:")
+        for row in history["daily"][:7]:
+            output_lines.append(
+                f"  {row['day'][5:]}: 均{self.format_price(row['avg_price'])} "
+                f"(高{self.format_price(row['max_price'])}/低{self.format_price(row['min_price'])})"
+            )
+        if len(history["daily"]) > 7:
+            output_lines.append(f"  ... 共 {len(history['daily'])} 天")
 
         yield self.chain_reply(event, "\n".join(output_lines))
 
     async def get_profit_history(self, event: AstrMessageEvent, query: str):
         """利润历史查询"""
         if not query or not query.strip():
-            yield self.chain_reply(event, "请输入要查询的物品名称或ID\n示例: /三角洲 利润历史 低级燃料")
+            yield self.chain_reply(event, "请输入要查询的物品名称或ID\n示例: /三角洲 利润历史 低级燃料 [30天]")
             return
 
-        query = query.strip()
+        query, days = self._split_history_days(query.strip(), self.DEFAULT_HISTORY_DAYS)
         yield self.chain_reply(event, "正在查询利润历史，请稍候...")
 
         # 使用通用方法解析查询（只取第一个结果）
@@ -349,17 +348,18 @@ class ToolsHandler(BaseHandler):
         object_id = object_ids[0]
         object_name = items_info[0].get("name", items_info[0].get("objectName", query)) if items_info else query
 
-        # 查询利润历史 (使用价格历史API + 材料价格计算)
-        price_result = await self.api.get_price_history(object_id)
-        material_result = await self.api.get_material_price(object_id)
+        # 查询利润历史 (使用本地价格历史 + 材料价格计算)
+        (history, history_error), material_result = await asyncio.gather(
+            self.price_store.get_history(object_id, days),
+            self.api.get_material_price(object_id)
+        )
 
-        if not self.is_success(price_result):
-            yield self.chain_reply(event, f"查询失败：{self.get_error_msg(price_result)}")
+        if not history and not self.is_success(material_result):
+            error = history_error if history_error is not None else material_result
+            yield self.chain_reply(event, f"查询失败：{self.get_error_msg(error)}")
             return
 
-        price_data = price_result.get("data", {})
-        history = price_data.get("history", [])
-        stats = price_data.get("stats", {})
+        stats = history["stats"] if history else {}
 
         # 获取材料成本
         material_cost = 0
@@ -394,7 +394,7 @@ class ToolsHandler(BaseHandler):
 
         # 历史价格趋势
         if stats:
-            output_lines.append("📊 价格统计 (7天):")
+            output_lines.append(f"📊 价格统计 ({days}天):")
             output_lines.append(f"  平均: {self.format_price(stats.get('avgPrice', '-'))}")
             output_lines.append(f"  最高: {self.format_price(stats.get('maxPrice', '-'))}")
             output_lines.append(f"  最低: {self.format_price(stats.get('minPrice', '-'))}")
@@ -406,7 +406,9 @@ class ToolsHandler(BaseHandler):
                     avg_profit = float(avg_price) - float(material_cost)
                     output_lines.append(f"  平均利润: {self.format_profit(avg_profit)}")
 
-        if not history and not materials:
+        if not history and history_error is not None:
+            output_lines.append(f"历史价格查询失败：{self.get_error_msg(history_error)}")
+        elif not history and not materials:
             output_lines.append("暂无历史数据")
 
         yield self.chain_reply(event, "\n".join(output_lines))
@@ -478,7 +480,8 @@ class ToolsHandler(BaseHandler):
 
         yield self.chain_reply(event, "正在查询利润排行，请稍候...")
 
-        result = await self.api.get_profit_rank(rank_type=rank_type, place=place)
+        with self.api.deadline(self.FANOUT_TIMEOUT):
+            result = await self.api.get_profit_rank(rank_type=rank_type, place=place)
         
         if not self.is_success(result):
             yield self.chain_reply(event, f"查询失败：{self.get_error_msg(result)}")
@@ -832,7 +835,8 @@ class ToolsHandler(BaseHandler):
 
         yield self.chain_reply(event, "正在查询最高利润...")
 
-        result = await self.api.get_profit_rank_v2(rank_type=rank_type, place=place)
+        with self.api.deadline(self.FANOUT_TIMEOUT):
+            result = await self.api.get_profit_rank_v2(rank_type=rank_type, place=place)
         
         if not self.is_success(result):
             yield self.chain_reply(event, f"查询失败：{self.get_error_msg(result)}")
@@ -913,8 +917,14 @@ class ToolsHandler(BaseHandler):
         output_lines.append("四个制造场所TOP3排行")
         output_lines.append("━━━━━━━━━━━━━━━")
 
+        # 四个场所并发查询，单个场所失败只影响该场所
+        results = await self.fan_out({
+            place_info["key"]: (lambda key=place_info["key"]: self.api.get_profit_rank_v2(rank_type=rank_type, place=key))
+            for place_info in places
+        })
+
         for place_info in places:
-            result = await self.api.get_profit_rank_v2(rank_type=rank_type, place=place_info["key"])
+            result = results[place_info["key"]]
             
             if not self.is_success(result):
                 output_lines.append(f"\n{place_info['name']}: 获取失败")
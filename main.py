@@ -2,6 +2,8 @@
 三角洲行动 AstrBot 插件
 主入口文件 - 负责命令注册和路由
 """
+import asyncio
+
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
@@ -9,6 +11,7 @@ from astrbot.api import AstrBotConfig
 
 from .df_api import DeltaForceAPI
 from .df_sqlite import DeltaForceSQLiteManager
+from .df_catalog import ItemCatalog
 from .handlers import (
     InfoHandler, AccountHandler, DataHandler, ToolsHandler, 
     SystemHandler, EntertainmentHandler, VoiceHandler, 
@@ -47,6 +50,13 @@ class DeltaForce(Star):
         self.api_mode = config.get("api_mode", "auto")
         self.api_timeout = config.get("api_timeout", 30)
         self.api_retry_count = config.get("api_retry_count", 3)
+        self.api_deadline = config.get("api_deadline", 40)
+        self.api_metrics_file = config.get("api_metrics_file", "")
+        self.api_max_body_mb = config.get("api_max_body_mb", 16)
+        self.api_rate_limit = config.get("api_rate_limit", DeltaForceAPI.RATE_LIMIT)
+        self.api_rate_burst = config.get("api_rate_burst", DeltaForceAPI.RATE_BURST)
+        self.api_max_concurrency = config.get("api_max_concurrency", DeltaForceAPI.MAX_CONCURRENCY)
+        self.api_background_concurrency = config.get("api_background_concurrency", DeltaForceAPI.BACKGROUND_CONCURRENCY)
         
         try:
             # 初始化 API 和数据库
@@ -55,15 +65,26 @@ class DeltaForce(Star):
                 clientid=self.clientid,
                 api_mode=self.api_mode,
                 timeout=self.api_timeout,
-                retry_count=self.api_retry_count
+                retry_count=self.api_retry_count,
+                deadline=self.api_deadline,
+                metrics_file=self.api_metrics_file,
+                max_body_size=int(self.api_max_body_mb * 1024 * 1024),
+                rate_limit=self.api_rate_limit,
+                rate_burst=self.api_rate_burst,
+                max_concurrency=self.api_max_concurrency,
+                background_concurrency=self.api_background_concurrency
             )
             self.db_manager = DeltaForceSQLiteManager()
+            self.item_catalog = ItemCatalog(
+                self.api, self.db_manager,
+                aliases=self._parse_item_aliases(config.get("item_aliases", ""))
+            )
             
             # 初始化各处理器
             self.info_handler = InfoHandler(self.api, self.db_manager)
             self.account_handler = AccountHandler(self.api, self.db_manager)
-            self.data_handler = DataHandler(self.api, self.db_manager)
-            self.tools_handler = ToolsHandler(self.api, self.db_manager)
+            self.data_handler = DataHandler(self.api, self.db_manager, self.item_catalog)
+            self.tools_handler = ToolsHandler(self.api, self.db_manager, self.item_catalog)
             self.system_handler = SystemHandler(self.api, self.db_manager)
             self.entertainment_handler = EntertainmentHandler(self.api, self.db_manager)
             self.voice_handler = VoiceHandler(self.api, self.db_manager)
@@ -72,6 +93,8 @@ class DeltaForce(Star):
             self.solution_handler = SolutionHandler(self.api, self.db_manager)
             self.calculator_handler = CalculatorHandler(self.api, self.db_manager)
             
+            self._warmup_task = None
+            
             # 推送模块 (可选)
             self.scheduler = None
             self.daily_keyword_push = None
@@ -91,18 +114,35 @@ class DeltaForce(Star):
     async def initialize(self):
         """插件初始化"""
         try:
+            # 创建 API 长连接会话，并在后台预热（不阻塞插件加载）
+            await self.api.start()
+            self._warmup_task = asyncio.create_task(self.api.warm_up())
+            
             success = await self.db_manager.initialize_table()
             if success:
                 logger.info("三角洲插件数据库初始化完成")
             else:
                 logger.error("三角洲插件数据库初始化失败")
             
+            # 后台加载/同步本地物品目录
+            await self.item_catalog.start()
+            
             # 初始化推送模块
             await self._init_push_module()
             
         except Exception as e:
             logger.error(f"插件初始化失败: {e}")
     
+    @staticmethod
+    def _parse_item_aliases(text: str) -> dict:
+        """解析物品别名配置，格式: 别名=物品全名，多个用逗号分隔"""
+        aliases = {}
+        for pair in (text or "").replace("，", ",").split(","):
+            alias, sep, name = pair.partition("=")
+            if sep and alias.strip() and name.strip():
+                aliases[alias.strip()] = name.strip()
+        return aliases
+
     async def _init_push_module(self):
         """初始化推送模块"""
         if not HAS_PUSH_MODULE:
@@ -117,6 +157,8 @@ class DeltaForce(Star):
             self.daily_keyword_push = DailyKeywordPush(self.context, self.api, self.config)
             self.daily_report_push = DailyReportPush(self.context, self.api, self.db_manager, self.config)
             self.weekly_report_push = WeeklyReportPush(self.context, self.api, self.db_manager, self.config)
+            await self.daily_report_push.migrate_config()
+            await self.weekly_report_push.migrate_config()
             
             # 创建特勤处推送实例
             self.place_task_push = PlaceTaskPush(self.context, self.api, self.db_manager, self.config)
@@ -156,6 +198,12 @@ class DeltaForce(Star):
                     self.weekly_report_push.execute,
                     self.weekly_report_push.cron
                 )
+            if self.broadcast_system.retention_days > 0:
+                self.scheduler.add_job(
+                    self.broadcast_system.CLEANUP_JOB_ID,
+                    self.broadcast_system.cleanup,
+                    self.broadcast_system.CLEANUP_CRON
+                )
             
             logger.info("三角洲推送模块初始化完成")
             
@@ -451,6 +499,20 @@ class DeltaForce(Star):
         async for result in self.system_handler.get_plugin_status(event):
             yield result
 
+    @filter.command("三角洲清除缓存", alias={"洲清除缓存", "三角洲清空缓存"})
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    async def clear_api_cache(self, event: AstrMessageEvent):
+        """清空API响应缓存（管理员）"""
+        async for result in self.system_handler.clear_api_cache(event):
+            yield result
+
+    @filter.command("三角洲API统计", alias={"洲API统计", "三角洲接口统计"})
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    async def get_api_metrics(self, event: AstrMessageEvent, sort_by: str = ""):
+        """查看各接口调用统计（管理员）"""
+        async for result in self.system_handler.get_api_metrics(event, sort_by):
+            yield result
+
     @filter.command("三角洲订阅战绩", alias={"洲订阅战绩", "三角洲战绩订阅"})
     async def subscribe_record(self, event: AstrMessageEvent, sub_type: str = ""):
         """订阅战绩推送"""
@@ -887,8 +949,8 @@ class DeltaForce(Star):
         yield event.plain_result(result.get("message", "广播发送失败"))
 
     @filter.command("三角洲广播历史", alias={"洲广播历史", "三角洲通知历史"})
-    async def get_broadcast_history(self, event: AstrMessageEvent):
-        """查看广播历史（仅管理员）"""
+    async def get_broadcast_history(self, event: AstrMessageEvent, before: str = ""):
+        """查看广播历史（仅管理员），可传入编号查看更早的记录"""
         if not self.broadcast_system:
             yield event.plain_result("广播功能未初始化")
             return
@@ -898,34 +960,73 @@ class DeltaForce(Star):
             yield event.plain_result("❌ 您没有权限查看广播历史")
             return
         
-        history = await self.broadcast_system.get_history(10)
+        page_size = 10
+        before_id = int(before) if before.strip().isdigit() else 0
+        history = await self.broadcast_system.get_history(page_size, before_id)
         
         if not history:
-            yield event.plain_result("暂无广播历史")
+            yield event.plain_result("暂无广播历史" if not before_id else "没有更早的广播记录")
             return
         
         import time
-        lines = ["📋 最近广播记录\n"]
-        for i, record in enumerate(history, 1):
+        lines = ["📋 最近广播记录\n" if not before_id else f"📋 编号 {before_id} 之前的广播记录\n"]
+        for record in history:
             timestamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(record["created_at"]))
             msg_preview = record["message"][:30] + "..." if len(record["message"]) > 30 else record["message"]
-            lines.append(f"{i}. [{timestamp}] {msg_preview}")
+            lines.append(f"#{record['id']} [{timestamp}] {msg_preview}")
             lines.append(f"   成功: {record['success_count']} | 失败: {record['fail_count']}")
         
+        lines.append("\n查看投递详情: /三角洲广播详情 <编号>")
+        if len(history) == page_size:
+            lines.append(f"查看更早记录: /三角洲广播历史 {history[-1]['id']}")
+        
+        yield event.plain_result("\n".join(lines))
+
+    @filter.command("三角洲广播详情", alias={"洲广播详情", "三角洲通知详情"})
+    async def get_broadcast_detail(self, event: AstrMessageEvent, broadcast_id: str = ""):
+        """查看某次广播的逐群投递结果（仅管理员）"""
+        if not self.broadcast_system:
+            yield event.plain_result("广播功能未初始化")
+            return
+        
+        sender_id = event.get_sender_id()
+        if not self.broadcast_system.is_admin(sender_id):
+            yield event.plain_result("❌ 您没有权限查看广播历史")
+            return
+        
+        if not broadcast_id.strip().isdigit():
+            yield event.plain_result("请输入广播编号\n用法: /三角洲广播详情 <编号>")
+            return
+        
+        deliveries = await self.broadcast_system.get_deliveries(int(broadcast_id))
+        if not deliveries:
+            yield event.plain_result(f"广播 #{broadcast_id} 没有投递记录")
+            return
+        
+        failed = [d for d in deliveries if d["success"] is False]
+        succeeded = sum(1 for d in deliveries if d["success"])
+        lines = [f"📋 广播 #{broadcast_id} 投递详情", f"目标: {len(deliveries)} | 成功: {succeeded} | 失败: {len(failed)}"]
+        if failed:
+            lines.append("\n失败目标:")
+            for delivery in failed[:20]:
+                lines.append(f"  {delivery['id']}: {delivery['error'] or '未知错误'}")
+            if len(failed) > 20:
+                lines.append(f"  ... 另有 {len(failed) - 20} 个")
+        
         yield event.plain_result("\n".join(lines))
 
     # ==================== 价格历史命令 ====================
 
     @filter.command("三角洲价格历史", alias={"洲价格历史", "三角洲历史价格"})
-    async def get_price_history(self, event: AstrMessageEvent, query: str = ""):
+    async def get_price_history(self, event: AstrMessageEvent, query: str = "", days: str = ""):
         """查询物品价格历史"""
-        async for result in self.tools_handler.get_price_history(event, query):
+        async for result in self.tools_handler.get_price_history(event, f"{query} {days}".strip()):
             yield result
 
     @filter.command("三角洲利润历史", alias={"洲利润历史", "三角洲历史利润"})
-    async def get_profit_history(self, event: AstrMessageEvent, query: str = ""):
+    async def get_profit_history(self, event: AstrMessageEvent, query: str = "", days: str = ""):
         """查询物品利润历史"""
-        async for result in self.tools_handler.get_profit_history(event, query):
+        async for result in self.tools_handler.get_profit_history(event, f"{query} {days}".strip()):
             yield result
 
     # ==================== 生命周期 ====================
@@ -938,4 +1039,13 @@ class DeltaForce(Star):
         # 关闭特勤处推送
         if self.place_task_push:
             await self.place_task_push.stop()
+        # 停止启动预热
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        # 停止物品目录同步
+        await self.item_catalog.stop()
+        # 关闭 API 连接池
+        await self.api.close()
+        # 关闭数据库连接
+        await self.db_manager.close()
         logger.info("三角洲插件已终止")
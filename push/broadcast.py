@@ -9,6 +9,7 @@
 3. 记录广播历史
 """
 import asyncio
+import time
 from typing import Dict, List, Any, TYPE_CHECKING
 
 from astrbot.api import logger
@@ -23,6 +24,10 @@ if TYPE_CHECKING:
 class BroadcastSystem:
     """广播通知系统"""
     
+    CLEANUP_JOB_ID = "delta_force_broadcast_cleanup"
+    CLEANUP_CRON = "0 4 * * *"  # 每天4点清理过期广播历史
+    DEFAULT_RETENTION_DAYS = 90  # 默认广播历史保留天数
+    
     def __init__(
         self, 
         context: "Context", 
@@ -54,6 +59,14 @@ class BroadcastSystem:
         # 解析格式: group_id1,group_id2 -> [{"type": "group", "id": "xxx"}]
         return [{"type": "group", "id": t.strip()} for t in targets_str.split(",") if t.strip()]
     
+    @property
+    def retention_days(self) -> int:
+        """广播历史保留天数，0 表示永久保留"""
+        try:
+            return max(0, int(self.config.get("broadcast_history_days", self.DEFAULT_RETENTION_DAYS)))
+        except (TypeError, ValueError):
+            return self.DEFAULT_RETENTION_DAYS
+    
     def is_admin(self, user_id: str) -> bool:
         """检查用户是否为管理员"""
         return str(user_id) in [str(u) for u in self.admin_users]
@@ -107,6 +120,7 @@ class BroadcastSystem:
         success_count = 0
         fail_count = 0
         details = []
+        deliveries = []  # 逐目标投递结果，写入广播历史
         
         # 构建消息链
         chain = MessageChain([
@@ -131,11 +145,14 @@ class BroadcastSystem:
                 
                 success_count += 1
                 details.append({"target": target_id, "success": True})
+                deliveries.append({"type": target_type, "id": target_id, "platform": platform, "success": True})
                 logger.info(f"[三角洲] 广播发送成功: {target_id}")
                 
             except Exception as e:
                 fail_count += 1
                 details.append({"target": target_id, "success": False, "error": str(e)})
+                deliveries.append({"type": target_type, "id": target_id, "platform": platform,
+                                   "success": False, "error": str(e)[:200]})
                 logger.error(f"[三角洲] 广播发送失败 {target_id}: {e}")
             
             # 发送间隔，避免风控
@@ -143,13 +160,13 @@ class BroadcastSystem:
                 await asyncio.sleep(delay)
         
         # 保存广播历史
-        target_ids = [t.get("id", "") for t in broadcast_targets]
         await self.db_manager.save_broadcast_history(
             sender_id=sender_id,
             message=message,
-            targets=target_ids,
+            targets=deliveries,
             success_count=success_count,
-            fail_count=fail_count
+            fail_count=fail_count,
+            durable=False
         )
         
         return {
@@ -160,9 +177,23 @@ class BroadcastSystem:
             "details": details
         }
     
-    async def get_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """获取广播历史"""
-        return await self.db_manager.get_broadcast_history(limit)
+    async def get_history(self, limit: int = 10, before_id: int = 0) -> List[Dict[str, Any]]:
+        """获取广播历史（before_id 为上一页最后一条的编号）"""
+        return await self.db_manager.get_broadcast_history(limit, before_id)
+    
+    async def get_deliveries(self, broadcast_id: int, failed_only: bool = False) -> List[Dict[str, Any]]:
+        """获取某次广播的逐目标投递记录"""
+        return await self.db_manager.get_broadcast_deliveries(broadcast_id, failed_only)
+    
+    async def cleanup(self):
+        """删除超过保留天数的广播历史，并整理数据库文件"""
+        days = self.retention_days
+        if days <= 0:
+            return
+        removed = await self.db_manager.prune_broadcast_history(int(time.time()) - days * 86400)
+        if removed > 0:
+            await self.db_manager.vacuum()
+            logger.info(f"[三角洲] 已清理 {removed} 条超过 {days} 天的广播历史")
     
     async def broadcast_to_single(
         self,
@@ -10,6 +10,8 @@ from astrbot.api import logger
 from astrbot.core.message.components import Plain
 from astrbot.core.message.message_event_result import MessageChain
 
+from ..df_api import background_priority
+
 if TYPE_CHECKING:
     from astrbot.api.star import Context
     from ..df_api import DeltaForceAPI
@@ -50,6 +52,7 @@ class DailyKeywordPush:
         """重新加载配置"""
         self.config = config
     
+    @background_priority
     async def execute(self):
         """执行每日密码推送"""
         # 重新读取配置检查是否启用
@@ -16,6 +16,8 @@ from astrbot.api import logger
 from astrbot.core.message.components import Plain, At
 from astrbot.core.message.message_event_result import MessageChain
 
+from ..df_api import background_priority
+
 if TYPE_CHECKING:
     from astrbot.api.star import Context
     from ..df_api import DeltaForceAPI
@@ -41,12 +43,15 @@ class PlaceTaskPush:
         self.db_manager = db_manager
         self.config = config
         
-        # 存储待推送的任务 {user_id: {place_id: {finish_time, object_name, push_targets}}}
+        # 存储待推送的任务 {user_id: {place_id: {finish_time, object_name, user_id}}}，同步持久化到数据库
         self.scheduled_tasks: Dict[str, Dict[str, Dict]] = {}
         
         # 已通知过期的用户，避免重复通知
         self.notified_expired: set = set()
         
+        # 各用户最近一次轮询的时间戳，重启后据此跳过刚轮询过的用户
+        self.polled_at: Dict[str, float] = {}
+        
         # 后台任务
         self._poll_task: Optional[asyncio.Task] = None
         self._push_task: Optional[asyncio.Task] = None
@@ -67,6 +72,9 @@ class PlaceTaskPush:
         
         self._is_running = True
         
+        # 恢复重启前的待推送任务和轮询状态
+        await self._restore()
+        
         # 启动轮询调度任务
         self._poll_task = asyncio.create_task(self._poll_and_schedule_loop())
         
@@ -86,6 +94,27 @@ class PlaceTaskPush:
         
         logger.info("[三角洲] 特勤处推送后台任务已停止")
     
+    async def _restore(self):
+        """从数据库恢复待推送任务、轮询时间和过期通知标记"""
+        try:
+            for task in await self.db_manager.get_place_tasks():
+                self.scheduled_tasks.setdefault(task["user_id"], {})[task["place_id"]] = {
+                    "finish_time": task["finish_time"],
+                    "object_name": task["object_name"],
+                    "user_id": task["user_id"]
+                }
+            for user_id, state in (await self.db_manager.get_place_push_states()).items():
+                self.polled_at[user_id] = state["polled_at"]
+                if state["expired_notified"]:
+                    self.notified_expired.add(user_id)
+            
+            pending = sum(len(tasks) for tasks in self.scheduled_tasks.values())
+            if pending:
+                logger.info(f"[三角洲] 已恢复 {pending} 个特勤处待推送任务")
+        except Exception as e:
+            logger.error(f"[三角洲] 恢复特勤处推送任务失败: {e}")
+    
+    @background_priority
     async def _poll_and_schedule_loop(self):
         """低频轮询调度器 - 从API同步状态并调度任务"""
         while self._is_running:
@@ -110,10 +139,8 @@ class PlaceTaskPush:
     
     async def _poll_and_schedule(self):
         """从API同步状态并调度任务"""
-        # 获取所有启用推送的用户
-        subscriptions = await self.db_manager.get_place_push_subscriptions()
-        
-        for sub in subscriptions:
+        # 分页流式遍历启用推送的用户
+        async for sub in self.db_manager.iter_place_push_subscriptions():
             user_id = sub.get("user_id")
             token = sub.get("token")
             push_targets = sub.get("push_targets", [])
@@ -121,6 +148,11 @@ class PlaceTaskPush:
             if not token or not push_targets:
                 continue
             
+            # 距上次轮询不足半个调度周期（如刚重启）时跳过，已恢复的任务照常推送；
+            # 留出余量，避免正常轮询因耗时抖动被隔轮跳过
+            if time.time() - self.polled_at.get(user_id, 0) < self.SCHEDULE_INTERVAL / 2:
+                continue
+            
             try:
                 result = await self.api.get_place_status(token)
                 
@@ -134,7 +166,9 @@ class PlaceTaskPush:
                     continue
                 
                 # 清除过期通知标记
-                self.notified_expired.discard(user_id)
+                if user_id in self.notified_expired:
+                    self.notified_expired.discard(user_id)
+                    await self.db_manager.set_place_push_expired(user_id, False)
                 
                 data = result.get("data", {})
                 places = data.get("places", []) if isinstance(data, dict) else []
@@ -145,7 +179,7 @@ class PlaceTaskPush:
                 current_tasks = set()
                 
                 for place in places:
-                    place_id = place.get("id")
+                    place_id = str(place.get("id"))
                     left_time = place.get("leftTime", 0)
                     object_detail = place.get("objectDetail", {})
                     
@@ -159,7 +193,6 @@ class PlaceTaskPush:
                     self.scheduled_tasks[user_id][place_id] = {
                         "finish_time": finish_time,
                         "object_name": object_detail.get("objectName", "未知物品"),
-                        "push_targets": push_targets,
                         "user_id": user_id
                     }
                 
@@ -168,6 +201,15 @@ class PlaceTaskPush:
                     if place_id not in current_tasks:
                         del self.scheduled_tasks[user_id][place_id]
                 
+                # 持久化本次轮询结果
+                self.polled_at[user_id] = time.time()
+                await self.db_manager.replace_place_tasks(
+                    user_id,
+                    [(place_id, task["finish_time"], task["object_name"])
+                     for place_id, task in self.scheduled_tasks[user_id].items()],
+                    int(self.polled_at[user_id])
+                )
+                
             except Exception as e:
                 logger.error(f"[三角洲] 获取用户 {user_id} 特勤处状态失败: {e}")
             
@@ -180,15 +222,17 @@ class PlaceTaskPush:
         for user_id, tasks in list(self.scheduled_tasks.items()):
             for place_id, task in list(tasks.items()):
                 if task["finish_time"] <= current_time:
-                    # 任务完成，推送通知
+                    # 任务完成，按当前订阅的推送目标发送通知
+                    sub = await self.db_manager.get_user_place_push_subscription(user_id)
                     await self._push_completion(
                         user_id=task["user_id"],
                         object_name=task["object_name"],
-                        push_targets=task["push_targets"]
+                        push_targets=sub.get("push_targets", []) if sub else []
                     )
                     
                     # 删除已推送的任务
                     del self.scheduled_tasks[user_id][place_id]
+                    await self.db_manager.remove_place_task(user_id, place_id)
     
     async def _push_completion(self, user_id: str, object_name: str, push_targets: List[Dict]):
         """推送制造完成通知"""
@@ -224,6 +268,7 @@ class PlaceTaskPush:
             return
         
         self.notified_expired.add(user_id)
+        await self.db_manager.set_place_push_expired(user_id, True)
         
         message = "您的三角洲行动登录已过期，特勤处推送功能已暂停。\n请使用 /三角洲 登录 重新登录以恢复推送功能。"
         
@@ -305,9 +350,11 @@ class PlaceTaskPush:
             )
             
             if success:
-                # 清理内存中的任务
-                if user_id in self.scheduled_tasks:
-                    del self.scheduled_tasks[user_id]
+                # 订阅已全部移除时清理内存中的任务（数据库中的任务随订阅一并删除）
+                if not await self.db_manager.get_user_place_push_subscription(user_id):
+                    self.scheduled_tasks.pop(user_id, None)
+                    self.polled_at.pop(user_id, None)
+                    self.notified_expired.discard(user_id)
                 return True, "✅ 已关闭特勤处制造完成推送"
             else:
                 return False, "您尚未开启特勤处推送"
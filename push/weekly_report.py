@@ -13,6 +13,8 @@ from astrbot.api import logger
 from astrbot.core.message.components import Plain, Image
 from astrbot.core.message.message_event_result import MessageChain
 
+from ..df_api import background_priority
+
 if TYPE_CHECKING:
     from astrbot.api.star import Context
     from ..df_api import DeltaForceAPI
@@ -26,6 +28,8 @@ class WeeklyReportPush:
     
     JOB_ID = "delta_force_weekly_report"
     DEFAULT_CRON = "0 10 * * 1"  # 每周一10点
+    REPORT_TYPE = "weekly"  # 数据库中的订阅类型
+    CONFIG_KEY = "push_weekly_report"  # 旧版配置中存放用户订阅的键
     
     def __init__(self, context: "Context", api: "DeltaForceAPI", 
                  db: "DeltaForceSQLiteManager", config: Dict[str, Any]):
@@ -76,6 +80,7 @@ class WeeklyReportPush:
         except:
             return "0分钟"
     
+    @background_priority
     async def execute(self):
         """执行周报推送"""
         if not self.enabled:
@@ -84,32 +89,48 @@ class WeeklyReportPush:
         logger.info("[三角洲] 开始执行周报推送...")
         
         try:
-            # 获取订阅了周报推送的用户
-            subscribed_users = self._get_subscribed_users()
+            # 分页流式遍历订阅了周报推送的用户
+            count = 0
+            async for subscription in self.db.iter_report_subscriptions(self.REPORT_TYPE):
+                await self._push_user_weekly_report(subscription["user_id"], subscription)
+                count += 1
+                await asyncio.sleep(2)  # 避免请求过快
             
-            if not subscribed_users:
+            if not count:
                 logger.info("[三角洲] 没有用户订阅周报推送")
                 return
             
-            for platform_id, user_config in subscribed_users.items():
-                await self._push_user_weekly_report(platform_id, user_config)
-                await asyncio.sleep(2)
-            
-            logger.info(f"[三角洲] 周报推送完成，共处理 {len(subscribed_users)} 个用户")
+            logger.info(f"[三角洲] 周报推送完成，共处理 {count} 个用户")
             
         except Exception as e:
             logger.error(f"[三角洲] 周报推送异常: {e}")
     
-    def _get_subscribed_users(self) -> Dict[str, Dict]:
-        """获取订阅了周报推送的用户"""
-        users = {}
-        for key, value in self._push_config.items():
-            if key.isdigit() and isinstance(value, dict):
-                if value.get("enabled") and value.get("push_to", {}).get("group"):
-                    users[key] = value
-        return users
+    async def migrate_config(self):
+        """将旧版配置中的用户订阅一次性迁移到数据库"""
+        push_config = self.config.get(self.CONFIG_KEY)
+        if not isinstance(push_config, dict):
+            return
+        user_ids = [key for key, value in push_config.items() if key.isdigit() and isinstance(value, dict)]
+        if not user_ids:
+            return
+        
+        rows = []
+        for user_id in user_ids:
+            user_config = push_config[user_id]
+            if user_config.get("enabled"):
+                for group_id in user_config.get("push_to", {}).get("group", []):
+                    rows.append((user_id, group_id, user_config.get("nickname", "")))
+        added = await self.db.import_report_subscriptions(self.REPORT_TYPE, rows)
+        if added < 0:
+            return  # 保留配置，下次启动重试
+        
+        for user_id in user_ids:
+            del push_config[user_id]
+        if hasattr(self.config, "save_config"):
+            self.config.save_config()
+        logger.info(f"[三角洲] 已将 {added} 条周报推送订阅从配置迁移到数据库")
     
-    async def _push_user_weekly_report(self, platform_id: str, user_config: Dict):
+    async def _push_user_weekly_report(self, platform_id: str, subscription: Dict):
         """为单个用户推送周报"""
         try:
             # 获取用户 token
@@ -138,7 +159,7 @@ class WeeklyReportPush:
                 return
             
             # 获取用户昵称
-            user_name = user_config.get("nickname", platform_id)
+            user_name = subscription.get("nickname") or platform_id
             try:
                 info_result = await self.api.get_personal_info(token)
                 if info_result.get("data"):
@@ -157,7 +178,7 @@ class WeeklyReportPush:
             fallback_message = self._build_weekly_report_message(user_name, sol_data, mp_data)
             
             # 推送到群
-            push_groups = user_config.get("push_to", {}).get("group", [])
+            push_groups = subscription.get("groups", [])
             await self._push_to_groups(image_bytes, fallback_message, push_groups)
             
         except Exception as e:
@@ -293,51 +314,22 @@ class WeeklyReportPush:
             except Exception as e:
                 logger.error(f"[三角洲] 推送周报到群 {group_id} 失败: {e}")
     
-    def toggle_user_push(self, platform_id: str, group_id: str, enable: bool, 
-                         nickname: str = "") -> tuple[bool, str]:
+    async def toggle_user_push(self, platform_id: str, group_id: str, enable: bool, 
+                               nickname: str = "") -> tuple[bool, str]:
         """
         开关用户的周报推送
         """
-        platform_id = str(platform_id)
-        group_id = str(group_id)
-        
-        if "push_weekly_report" not in self.config:
-            self.config["push_weekly_report"] = {
-                "enabled": False,
-                "cron": self.DEFAULT_CRON
-            }
-        
-        push_config = self.config["push_weekly_report"]
-        
-        if platform_id not in push_config:
-            push_config[platform_id] = {
-                "enabled": False,
-                "nickname": nickname or platform_id,
-                "push_to": {"group": []}
-            }
-        
-        user_config = push_config[platform_id]
-        groups = user_config.get("push_to", {}).get("group", [])
-        groups = [str(g) for g in groups]
-        
         if enable:
-            if group_id in groups:
+            added = await self.db.add_report_subscription(self.REPORT_TYPE, platform_id, group_id, nickname)
+            if added < 0:
+                return False, "开启周报推送失败，请稍后重试"
+            if added == 0:
                 return False, "已开启周报推送到此群"
-            groups.append(group_id)
-            user_config["enabled"] = True
-            push_config["enabled"] = True
-            if nickname:
-                user_config["nickname"] = nickname
-            msg = "已开启周报推送"
-        else:
-            if group_id not in groups:
-                return False, "尚未开启周报推送到此群"
-            groups.remove(group_id)
-            if not groups:
-                user_config["enabled"] = False
-            msg = "已关闭周报推送"
-        
-        user_config["push_to"] = {"group": groups}
-        self._push_config = push_config
+            return True, "已开启周报推送"
         
-        return True, msg
+        removed = await self.db.remove_report_subscription(self.REPORT_TYPE, platform_id, group_id)
+        if removed < 0:
+            return False, "关闭周报推送失败，请稍后重试"
+        if removed == 0:
+            return False, "尚未开启周报推送到此群"
+        return True, "已关闭周报推送"